@@ -0,0 +1,108 @@
+# Read-only JSON views of the same data, versioned under /api/v1.
+# Collections are keyset-paginated like the HTML listings, or streamed in
+# full as newline-delimited JSON when the client asks for
+# application/x-ndjson (or passes ?format=ndjson).
+
+import json
+from datetime import date
+
+from flask import Blueprint, current_app, request, stream_with_context
+
+from artists import artist_serializer, artist_summary_serializer
+from helpers import (
+    calendar_query, calendar_range, calendar_serializer, facet_args, facet_criteria, page_args, page_url,
+    show_listing_query, show_serializer
+)
+from models import Artist, Venue
+from pagination import keyset_page
+from shows import SHOWS_KEYS
+from venues import venue_serializer, venue_summary_serializer
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def api_response(data, status=200):
+    return current_app.response_class(
+        json.dumps(data, default=json_default), status=status, mimetype='application/json')
+
+
+def wants_ndjson():
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best_match(
+        ['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+
+
+def ndjson_response(query, serializer):
+    # Stream one JSON document per row from a server-side cursor, fetching
+    # API_STREAM_BATCH rows at a time so memory stays flat however many rows
+    # the query returns.
+    def generate():
+        rows = query.execution_options(stream_results=True).yield_per(current_app.config['API_STREAM_BATCH'])
+        for row in rows:
+            yield json.dumps(serializer(row), default=json_default) + '\n'
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def api_collection(query, keys, serializer):
+    if wants_ndjson():
+        return ndjson_response(query.order_by(*keys), serializer)
+    page = keyset_page(query, keys, **page_args())
+    return api_response({
+        'data': [serializer(row) for row in page.items],
+        'next': page_url(after=page.next_cursor) if page.next_cursor else None,
+        'prev': page_url(before=page.prev_cursor) if page.prev_cursor else None
+    })
+
+
+def api_show_serializer(show):
+    data = show_serializer(show)
+    data['id'] = show.id
+    return data
+
+
+@bp.route('/venues')
+def api_venues():
+    query = Venue.query.filter(*facet_criteria(Venue, facet_args()))
+    return api_collection(query, (Venue.id,), venue_summary_serializer)
+
+
+@bp.route('/venues/<int:venue_id>')
+def api_venue(venue_id):
+    return api_response(venue_serializer(Venue.query.get_or_404(venue_id)))
+
+
+@bp.route('/artists')
+def api_artists():
+    query = Artist.query.filter(*facet_criteria(Artist, facet_args()))
+    return api_collection(query, (Artist.id,), artist_summary_serializer)
+
+
+@bp.route('/artists/<int:artist_id>')
+def api_artist(artist_id):
+    return api_response(artist_serializer(Artist.query.get_or_404(artist_id)))
+
+
+@bp.route('/venues/<int:venue_id>/calendar')
+def api_venue_calendar(venue_id):
+    Venue.query.get_or_404(venue_id)
+    start, end = calendar_range()
+    return api_response(calendar_serializer(calendar_query(Venue, venue_id, start, end), start, end))
+
+
+@bp.route('/artists/<int:artist_id>/calendar')
+def api_artist_calendar(artist_id):
+    Artist.query.get_or_404(artist_id)
+    start, end = calendar_range()
+    return api_response(calendar_serializer(calendar_query(Artist, artist_id, start, end), start, end))
+
+
+@bp.route('/shows')
+def api_shows():
+    return api_collection(show_listing_query(), SHOWS_KEYS, api_show_serializer)
@@ -0,0 +1,218 @@
+import sys
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+
+from extensions import db, response_cache
+from forms import ArtistForm
+from helpers import (
+    artist_shows_query, conditional, facet_args, facet_counts, facet_criteria, get_genres,
+    invalidate_artist, page_args, render_calendar, search_serializer, split_shows
+)
+from models import Artist, relist, touch_artist
+from pagination import keyset_page
+
+bp = Blueprint('artists', __name__)
+
+
+ARTISTS_KEYS = (Artist.name, Artist.id)
+
+
+def artists_query(filters):
+    return db.session.query(
+        Artist.id, Artist.name, Artist.upcoming_shows_count.label('num_upcoming_shows')
+    ).filter(*facet_criteria(Artist, filters))
+
+
+@bp.route('/artists')
+@response_cache.cached('artists')
+def artists():
+    filters = facet_args()
+    page = keyset_page(artists_query(filters), ARTISTS_KEYS, **page_args())
+    return render_template(
+        'pages/artists.html', artists=page.items, page=page,
+        filters=filters, facets=facet_counts(Artist, filters))
+
+
+@bp.route('/artists/search', methods=['POST'])
+def search_artists():
+    # implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+    # search for "band" should return "The Wild Sax Band".
+    search_term = request.form.get('search_term', '')
+    page = max(request.form.get('page', 1, type=int), 1)
+    response = search_serializer(search_term, content_type=Artist, page=page)
+    return render_template(
+        'pages/search_artists.html',
+        results=response,
+        search_term=search_term)
+
+
+def artist_summary_serializer(artist):
+    # The artist's own fields, without its shows.
+    data = {
+        'id': artist.id,
+        'name': artist.name,
+        "genres": [genre.name for genre in artist.genres],
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website_link,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link
+    }
+    return data
+
+
+def artist_serializer(artist, shows=None):
+    # ``shows`` are the artist's show rows when the caller already has them.
+    if shows is None:
+        shows = artist_shows_query(artist.id)
+    past_shows, upcoming_shows = split_shows(shows)
+
+    data = artist_summary_serializer(artist)
+    data.update({
+        'past_shows': past_shows,
+        'upcoming_shows': upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows)
+    })
+    return data
+
+
+@bp.route('/artists/<int:artist_id>')
+@conditional(Artist, 'artist_id')
+@response_cache.cached('artist:{artist_id}')
+def show_artist(artist_id):
+    # shows the artist page with the given artist_id
+    return render_artist_page(artist_serializer(Artist.query.get_or_404(artist_id)))
+
+
+def render_artist_page(data):
+    # The first upcoming show becomes a past one when it starts, so the
+    # cached page expires then.
+    if data['upcoming_shows']:
+        response_cache.expire_at(data['upcoming_shows'][0]['start_time'].timestamp())
+    return render_template('pages/show_artist.html', artist=data)
+
+
+@bp.route('/artists/<int:artist_id>/calendar')
+@response_cache.cached('artist:{artist_id}')
+def artist_calendar(artist_id):
+    # the artist's shows over ?month=YYYY-MM or ?start=...&end=..., by day
+    artist = Artist.query.get_or_404(artist_id)
+    return render_calendar(artist, url_for('artists.show_artist', artist_id=artist_id))
+
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+    form = ArtistForm()
+    artist = Artist.query.get_or_404(artist_id)
+
+    form.name.data = artist.name
+    form.city.data = artist.city
+    form.genres.data = [genre.name for genre in artist.genres]
+    form.state.data = artist.state
+    form.phone.data = artist.phone
+    form.website_link.data = artist.website_link
+    form.facebook_link.data = artist.facebook_link
+    form.seeking_venue.data = artist.seeking_venue
+    form.seeking_description.data = artist.seeking_description
+    form.image_link.data = artist.image_link
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    # artist record with ID <artist_id> using the new attributes
+    form = ArtistForm(request.form)
+    data = form.data.copy()
+    _ = data.pop('csrf_token')
+    artist = Artist.query.get_or_404(artist_id)
+    genres = data.pop('genres')
+    error = False
+    try:
+        genres = get_genres(genres)
+        artist.name = form.name.data
+        artist.city = form.city.data
+        artist.state = form.state.data
+        artist.phone = form.phone.data
+        artist.genres = genres
+        artist.seeking_venue = form.seeking_venue.data
+        artist.seeking_description = form.seeking_description.data
+        artist.facebook_link = form.facebook_link.data
+        artist.website_link = form.website_link.data
+        artist.image_link = form.image_link.data
+        relist(artist)
+        touch_artist(artist)
+
+        db.session.commit()
+        invalidate_artist(artist_id)
+    except Exception as e:
+        db.session.rollback()
+        error = True
+        print(e)
+    finally:
+        db.session.close()
+        if not error:
+            flash(
+                f'Artist {form.name.data} was updated updated!',
+                category='success-message'
+            )
+            return redirect(url_for('artists.show_artist', artist_id=artist_id))
+        else:
+            flash(
+                f'An Error occurred while updating Venue {form.name.data}',
+                category='error-message'
+            )
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    # called upon submitting the new artist listing form
+    form = ArtistForm(request.form)
+    data = form.data.copy()
+    _ = data.pop('csrf_token')
+    artist_id = None
+    genres = data.pop('genres')
+    error = False
+    try:
+        genres = get_genres(genres)
+        artist = Artist(**data, genres=genres)
+        db.session.add(artist)
+        db.session.commit()
+        artist_id = artist.id
+        response_cache.invalidate('artists')
+    except Exception as e:
+        db.session.rollback()
+        error = True
+        sys.stdout.write(e)
+    finally:
+        db.session.close()
+        if not error:
+            flash(
+                f'Artist {form.name.data} was successfully listed!',
+                category='success-message'
+            )
+            return redirect(url_for('artists.show_artist', artist_id=artist_id))
+        else:
+            flash(
+                f'An Error occurred while creating Artist {form.name.data}',
+                category='error-message'
+            )
+
+    # on successful db insert, flash success
+    return render_template('pages/home.html')
@@ -0,0 +1,170 @@
+# Entry point for ASGI servers, e.g.
+#
+#     uvicorn asgi:app --workers 4
+#
+# The listing, detail and search pages are served by the coroutine views of
+# async_views.py on the server's event loop, so a worker waiting on the
+# database or on a slow client keeps serving other requests. Every other
+# route runs the WSGI app through asgiref, in a single thread per process;
+# forms and the JSON API are better left to wsgi.py when they carry real
+# traffic.
+
+import io
+import sys
+from collections import defaultdict
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import request_started
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+
+from app import create_app
+from async_views import VIEWS
+from extensions import async_db
+from helpers import has_fts_table
+from models import Artist, Venue
+
+
+def build_environ(scope, body):
+    # The WSGI environ of an ASGI HTTP request, as asgiref's WsgiToAsgi
+    # builds it.
+    script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+    path_info = scope['path'].encode('utf8').decode('latin1')
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    headers = defaultdict(list)
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        headers[key].append(value.decode('latin1'))
+    environ.update((key, ','.join(values)) for key, values in headers.items())
+    return environ
+
+
+class AsyncReadApp:
+    """ASGI application running ``views`` natively and the rest as WSGI.
+
+    ``views`` maps endpoint names to coroutine views. A matching request is
+    dispatched inside a regular Flask request context, so before/after
+    request hooks (metrics, profiler, sessions), error handlers, flashed
+    messages, url_for and templates behave as on the WSGI path. Profiled
+    requests (``?__profile=``) always take the WSGI path, where cProfile
+    sees only their own work.
+    """
+
+    def __init__(self, app, views):
+        self.app = app
+        self.views = views
+        self.wsgi = WsgiToAsgi(app)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] == 'http' and b'__profile=' not in scope['query_string']:
+            view, view_args = self.match(scope)
+            if view is not None:
+                body = await self.read_body(receive)
+                await self.dispatch(view, view_args, build_environ(scope, body), send)
+                return
+        await self.wsgi(scope, receive, send)
+
+    def match(self, scope):
+        adapter = self.app.url_map.bind(
+            scope.get('server', ('localhost',))[0], script_name=scope.get('root_path') or None,
+            url_scheme=scope.get('scheme', 'http'), path_info=scope['path'])
+        try:
+            endpoint, view_args = adapter.match(method=scope['method'])
+        except (HTTPException, RequestRedirect):
+            return None, None
+        return self.views.get(endpoint), view_args
+
+    @staticmethod
+    async def read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        return b''.join(chunks)
+
+    async def dispatch(self, view, view_args, environ, send):
+        # Flask.wsgi_app and full_dispatch_request, awaiting the view.
+        app = self.app
+        ctx = app.request_context(environ)
+        error = None
+        try:
+            try:
+                ctx.push()
+                try:
+                    app.try_trigger_before_first_request_functions()
+                    request_started.send(app)
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view(**view_args)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                error = e
+                response = app.handle_exception(e)
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': [
+                    (name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in response.get_wsgi_headers(environ)
+                ],
+            })
+            await send({
+                'type': 'http.response.body',
+                'body': b''.join(response.get_app_iter(environ)),
+            })
+        finally:
+            if app.should_ignore_error(error):
+                error = None
+            ctx.auto_pop(error)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Look the search tables up now, without blocking the loop
+                # on the sync engine at the first search.
+                await async_db.run_sync(lambda connection: [
+                    has_fts_table(model, connection) for model in (Venue, Artist)])
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_db.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = AsyncReadApp(create_app(), VIEWS)
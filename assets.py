@@ -0,0 +1,165 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from flask import abort, request, send_from_directory, url_for
+
+# Bundles written by build_assets(), by name, with the files under static/
+# they are made of, in order. Scripts are only concatenated: the libraries
+# are shipped minified and the app's own scripts are a few hundred bytes.
+BUNDLES = {
+    'fyyur.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    # Loaded synchronously in <head>.
+    'head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    # Deferred, after jQuery; in the order the separate deferred scripts ran.
+    'fyyur.js': [
+        'js/script.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+}
+
+MANIFEST = 'manifest.json'
+
+# Precompressed variants, in order of preference.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,])\s*')
+
+
+def minify_css(css):
+    # Drops comments and the whitespace around braces, semicolons and
+    # commas. Spaces elsewhere are only collapsed: inside selectors they can
+    # be descendant combinators.
+    css = _CSS_COMMENT.sub('', css)
+    css = _CSS_SPACE.sub(' ', css)
+    css = _CSS_PUNCTUATION.sub(r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def bundle(static_folder, name):
+    parts = []
+    for path in BUNDLES[name]:
+        with open(os.path.join(static_folder, path), encoding='utf-8') as f:
+            source = f.read()
+        if name.endswith('.css') and '.min.' not in path:
+            source = minify_css(source)
+        parts.append(source.strip())
+    # A script without a trailing semicolon must not run into the next one.
+    return ('\n' if name.endswith('.css') else ';\n').join(parts) + '\n'
+
+
+def build_assets(static_folder, output):
+    """Write every bundle to ``output`` under a content-hashed name.
+
+    Each bundle is written as e.g. ``fyyur.3f2a9c0b1d4e.css`` with ``.gz``
+    and, when the brotli package is installed, ``.br`` siblings, and
+    ``manifest.json`` maps bundle names to the hashed names. Returns the
+    manifest.
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    os.makedirs(output, exist_ok=True)
+    try:
+        with open(os.path.join(output, MANIFEST)) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    manifest = {}
+    for name in BUNDLES:
+        data = bundle(static_folder, name).encode('utf-8')
+        stem, ext = os.path.splitext(name)
+        hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        path = os.path.join(output, hashed)
+        with open(path, 'wb') as f:
+            f.write(data)
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, 9, mtime=0))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+        manifest[name] = hashed
+    # Pages rendered by workers still running the previous build link its
+    # files, so those are kept; anything older is removed.
+    keep = set(manifest.values()) | set(previous.values())
+    for entry in os.scandir(output):
+        hashed = entry.name[:-3] if entry.name.endswith(('.gz', '.br')) else entry.name
+        if entry.name != MANIFEST and hashed not in keep:
+            os.remove(entry.path)
+    with open(os.path.join(output, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return manifest
+
+
+class Assets:
+    """Serve the bundles built by ``flask fyyur build-assets``.
+
+    Bundles are served from ``ASSETS_DIR`` at /assets/<hashed name> with
+    far-future immutable caching, as the ``.br`` or ``.gz`` variant when the
+    client accepts it. Templates link them with ``asset_urls(name)``, which
+    gives the bundle's URL, or the URLs of its source files under /static
+    when no build is present (e.g. in development). The manifest is read
+    when the app is created.
+    """
+
+    max_age = 365 * 24 * 3600
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = app.config['ASSETS_DIR']
+        try:
+            with open(os.path.join(self.directory, MANIFEST)) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        app.add_url_rule('/assets/<filename>', 'asset', self.send_asset)
+        app.add_template_global(self.asset_urls)
+        app.extensions['assets'] = self
+
+    def asset_urls(self, name):
+        if name in self.manifest:
+            return [url_for('asset', filename=self.manifest[name])]
+        return [url_for('static', filename=path) for path in BUNDLES[name]]
+
+    def send_asset(self, filename):
+        # Any build's bundle, not only this process's: during a rolling
+        # deploy, pages from other workers may link the previous build.
+        if filename == MANIFEST or filename.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+            abort(404)
+        encoding = None
+        for candidate, suffix in ENCODINGS:
+            if request.accept_encodings[candidate] and \
+                    os.path.exists(os.path.join(self.directory, filename + suffix)):
+                encoding = candidate
+                break
+        path = filename + dict(ENCODINGS)[encoding] if encoding else filename
+        response = send_from_directory(self.directory, path, max_age=self.max_age)
+        # The type of the bundle, not of its compressed file.
+        del response.headers['Content-Disposition']
+        response.mimetype = 'text/css' if filename.endswith('.css') else 'application/javascript'
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,104 @@
+# Coroutine versions of the read-only pages, served by asgi.py. They build
+# the same statements as the sync views in venues.py, artists.py and
+# shows.py (db.session only compiles the queries here, it never connects)
+# and await them on async_db, running independent statements concurrently.
+
+import asyncio
+
+from flask import abort, render_template, request
+
+from artists import ARTISTS_KEYS, artist_serializer, artists_query, render_artist_page
+from extensions import async_db, response_cache
+from helpers import (
+    artist_shows_query, conditional, facet_args, facet_counts_query, group_facet_counts,
+    page_args, search_page_query, search_response, show_listing_query, show_serializer, venue_shows_query
+)
+from models import Artist, Venue
+from pagination import keyset_query
+from shows import SHOWS_KEYS
+from venues import VENUES_KEYS, render_venue_page, venue_areas_serializer, venue_serializer, venues_query
+
+
+async def keyset_rows(query, keys):
+    query, page = keyset_query(query, keys, **page_args())
+    return page(await async_db.all(query.statement))
+
+
+@response_cache.cached('venues')
+async def venues():
+    filters = facet_args()
+    page, facets = await asyncio.gather(
+        keyset_rows(venues_query(filters), VENUES_KEYS),
+        async_db.all(facet_counts_query(Venue, filters)))
+    return render_template(
+        'pages/venues.html', areas=venue_areas_serializer(page.items), page=page,
+        filters=filters, facets=group_facet_counts(facets))
+
+
+@conditional(Venue, 'venue_id')
+@response_cache.cached('venue:{venue_id}')
+async def show_venue(venue_id):
+    venue, shows = await asyncio.gather(
+        async_db.get(Venue, venue_id),
+        async_db.all(venue_shows_query(venue_id).statement))
+    if venue is None:
+        abort(404)
+    return render_venue_page(venue_serializer(venue, shows))
+
+
+@response_cache.cached('artists')
+async def artists():
+    filters = facet_args()
+    page, facets = await asyncio.gather(
+        keyset_rows(artists_query(filters), ARTISTS_KEYS),
+        async_db.all(facet_counts_query(Artist, filters)))
+    return render_template(
+        'pages/artists.html', artists=page.items, page=page,
+        filters=filters, facets=group_facet_counts(facets))
+
+
+@conditional(Artist, 'artist_id')
+@response_cache.cached('artist:{artist_id}')
+async def show_artist(artist_id):
+    artist, shows = await asyncio.gather(
+        async_db.get(Artist, artist_id),
+        async_db.all(artist_shows_query(artist_id).statement))
+    if artist is None:
+        abort(404)
+    return render_artist_page(artist_serializer(artist, shows))
+
+
+@response_cache.cached('shows')
+async def shows():
+    page = await keyset_rows(show_listing_query(), SHOWS_KEYS)
+    data = [show_serializer(show) for show in page.items]
+    return render_template('pages/shows.html', shows=data, page=page)
+
+
+async def search(content_type, template):
+    search_term = request.form.get('search_term', '')
+    page = max(request.form.get('page', 1, type=int), 1)
+    rows = []
+    if search_term:
+        rows = await async_db.all(search_page_query(search_term, content_type, page).statement)
+    return render_template(template, results=search_response(rows, page), search_term=search_term)
+
+
+async def search_venues():
+    return await search(Venue, 'pages/search_venues.html')
+
+
+async def search_artists():
+    return await search(Artist, 'pages/search_artists.html')
+
+
+# Endpoints served by these views instead of the sync ones.
+VIEWS = {
+    'venues.venues': venues,
+    'venues.show_venue': show_venue,
+    'venues.search_venues': search_venues,
+    'artists.artists': artists,
+    'artists.show_artist': show_artist,
+    'artists.search_artists': search_artists,
+    'shows.shows': shows,
+}
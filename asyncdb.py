@@ -0,0 +1,87 @@
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+
+from routing import REPLICA, reads_from_replica
+
+# Async drivers used in place of the configured ones.
+ASYNC_DRIVERS = {
+    'postgres': 'postgresql+asyncpg',
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_url(url):
+    url = make_url(url)
+    backend = url.drivername.split('+')[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver for {backend!r} databases')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class AsyncDatabase:
+    """Async engines on the same databases as ``db``, for the ASGI read path.
+
+    Engines are created on first use, so processes serving WSGI never load
+    the async drivers (asyncpg, aiosqlite). They take the pool settings of
+    SQLALCHEMY_ENGINE_OPTIONS and, on Postgres, DB_STATEMENT_TIMEOUT_MS. Like
+    ``db``, reads of GET requests go to the ``replica`` bind when there is
+    one (see routing.py).
+
+    Each ``all``/``get`` call runs in its own session on its own pooled
+    connection, so independent statements can be awaited together with
+    ``asyncio.gather``.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._engines = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['async_db'] = self
+
+    def engine(self, bind=None):
+        if bind not in self._engines:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            config = self.app.config
+            url = async_url(config['SQLALCHEMY_BINDS'][bind] if bind else config['SQLALCHEMY_DATABASE_URI'])
+            options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+            options.pop('connect_args', None)
+            timeout = config.get('DB_STATEMENT_TIMEOUT_MS')
+            if url.get_backend_name() == 'postgresql' and timeout:
+                options['connect_args'] = {'server_settings': {'statement_timeout': str(timeout)}}
+            self._engines[bind] = create_async_engine(url, **options)
+        return self._engines[bind]
+
+    def session(self):
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        bind = REPLICA if reads_from_replica(self.app) else None
+        return AsyncSession(self.engine(bind), expire_on_commit=False)
+
+    async def all(self, statement):
+        # The rows of ``statement``, a select() or a Query's ``.statement``.
+        async with self.session() as session:
+            return (await session.execute(statement)).all()
+
+    async def get(self, model, ident):
+        # The ``model`` instance with primary key ``ident``, eager relationships
+        # loaded, or None.
+        async with self.session() as session:
+            return (await session.execute(select(model).filter_by(id=ident))).scalar_one_or_none()
+
+    async def run_sync(self, fn, *args):
+        # Call ``fn(connection, *args)`` with a sync facade of an async
+        # connection, e.g. for inspect().
+        async with self.session() as session:
+            connection = await session.connection()
+            return await connection.run_sync(fn, *args)
+
+    async def dispose(self):
+        for engine in self._engines.values():
+            await engine.dispose()
+        self._engines.clear()
@@ -0,0 +1,310 @@
+"""Route benchmarks with SQL query budgets.
+
+Seeds a fresh SQLite database per dataset size, runs every page and form
+submission through the Flask test client, and reports latency percentiles
+and the number of SQL statements each request ran::
+
+    python bench.py                          # small and medium datasets
+    python bench.py --sizes small,large
+    python bench.py --update-baseline        # after an intended change
+    python bench.py --latency --baseline local.json
+    python bench.py --datetime               # the datetime filter alone
+
+The run fails when a route runs more queries than its budget, more
+queries on a larger dataset than on a smaller one (an N+1) or more
+queries than the stored baseline. With ``--latency`` it also fails when
+a median latency grows past ``--tolerance`` times the baseline; latencies
+are only comparable on the machine that recorded them, so compare against
+a baseline recorded there, not the committed one.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# (venues, artists, shows) per dataset size.
+SIZES = {
+    'small': (200, 400, 5000),
+    'medium': (2000, 4000, 50000),
+    'large': (20000, 40000, 500000),
+}
+
+# The most SQL statements each route may run, whatever the dataset size.
+BUDGETS = {
+    'home': 0,
+    'venues': 2,
+    # The page version stamp read for the ETag, then the page itself.
+    'venue': 4,
+    'venue_search': 1,
+    'venue_create': 5,
+    'venue_edit_form': 2,
+    # The edit, and the page version stamps of the other side's pages when
+    # it renames the venue or changes its image.
+    'venue_edit': 5,
+    'artists': 2,
+    'artist': 4,
+    'artist_search': 1,
+    'artist_create': 5,
+    'artist_edit_form': 2,
+    'artist_edit': 5,
+    'shows': 1,
+    # With the double booking check and the show_listing row.
+    'show_create': 7,
+}
+
+Case = namedtuple('Case', ['name', 'method', 'url', 'data'])
+
+
+def percentile(samples, p):
+    # Nearest-rank percentile of a sorted list.
+    return samples[min(len(samples) - 1, int(round(p / 100 * len(samples) + 0.5)) - 1)]
+
+
+def build_cases(venue, artist):
+    # Requests against the busiest venue and artist of the dataset, so the
+    # detail pages and edits are measured at their worst.
+    venue_form = {
+        'name': venue.name, 'city': venue.city, 'state': venue.state,
+        'address': venue.address, 'phone': venue.phone, 'image_link': venue.image_link,
+        'genres': [genre.name for genre in venue.genres],
+        'facebook_link': venue.facebook_link, 'website_link': venue.website_link,
+        'seeking_description': venue.seeking_description or '',
+    }
+    artist_form = {
+        'name': artist.name, 'city': artist.city, 'state': artist.state,
+        'phone': artist.phone, 'image_link': artist.image_link,
+        'genres': [genre.name for genre in artist.genres],
+        'facebook_link': artist.facebook_link, 'website_link': artist.website_link or '',
+        'seeking_description': artist.seeking_description or '',
+    }
+    start_time = datetime.now() + timedelta(days=30)
+    return [
+        Case('home', 'GET', '/', None),
+        Case('venues', 'GET', '/venues', None),
+        Case('venue', 'GET', f'/venues/{venue.id}', None),
+        Case('venue_search', 'POST', '/venues/search', {'search_term': 'the'}),
+        Case('venue_create', 'POST', '/venues/create', venue_form),
+        Case('venue_edit_form', 'GET', f'/venues/{venue.id}/edit', None),
+        Case('venue_edit', 'POST', f'/venues/{venue.id}/edit', venue_form),
+        Case('artists', 'GET', '/artists', None),
+        Case('artist', 'GET', f'/artists/{artist.id}', None),
+        Case('artist_search', 'POST', '/artists/search', {'search_term': 'band'}),
+        Case('artist_create', 'POST', '/artists/create', artist_form),
+        Case('artist_edit_form', 'GET', f'/artists/{artist.id}/edit', None),
+        Case('artist_edit', 'POST', f'/artists/{artist.id}/edit', artist_form),
+        Case('shows', 'GET', '/shows', None),
+        # A day apart, so that no show is rejected as a double booking.
+        Case('show_create', 'POST', '/shows/create', lambda i: {
+            'venue_id': venue.id, 'artist_id': artist.id,
+            'start_time': (start_time + timedelta(days=i)).strftime('%Y-%m-%d %H:%M:%S')}),
+    ]
+
+
+def run_size(app, size, directory, repeat, warmup):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    from commands import seed_database
+    from extensions import db
+    from models import Artist, Venue
+
+    path = os.path.join(directory, f'{size}.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        seed_database(*SIZES[size], seed=0)
+        print(f'{size}: seeded {SIZES[size]} in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+        busiest = (Venue.past_shows_count + Venue.upcoming_shows_count).desc()
+        venue = Venue.query.order_by(busiest).first()
+        artist = Artist.query.order_by((Artist.past_shows_count + Artist.upcoming_shows_count).desc()).first()
+        cases = build_cases(venue, artist)
+        db.session.remove()
+
+    queries = []
+
+    def count_query(*args):
+        queries.append(None)
+
+    event.listen(Engine, 'before_cursor_execute', count_query)
+    results = {}
+    try:
+        for case in cases:
+            timings, counts = [], []
+            for i in range(warmup + repeat):
+                # A new client per request so flashed messages from the
+                # submissions do not leak into later pages.
+                client = app.test_client()
+                data = case.data(i) if callable(case.data) else case.data
+                del queries[:]
+                started = time.perf_counter()
+                response = client.open(case.url, method=case.method, data=data)
+                elapsed = time.perf_counter() - started
+                if response.status_code >= 400:
+                    raise RuntimeError(f'{case.method} {case.url} returned {response.status_code}')
+                if i >= warmup:
+                    timings.append(elapsed * 1000)
+                    counts.append(len(queries))
+            timings.sort()
+            results[case.name] = {
+                'p50': round(percentile(timings, 50), 2),
+                'p95': round(percentile(timings, 95), 2),
+                'p99': round(percentile(timings, 99), 2),
+                'queries': max(counts),
+            }
+    finally:
+        event.remove(Engine, 'before_cursor_execute', count_query)
+        with app.app_context():
+            db.session.remove()
+            db.get_engine().dispose()
+    return results
+
+
+def check(results, baseline, tolerance=None):
+    # Returns a list of failure messages; latencies are compared with the
+    # baseline only given a ``tolerance``.
+    failures = []
+    previous = None
+    for size, routes in results.items():
+        for name, result in routes.items():
+            budget = BUDGETS.get(name)
+            if budget is not None and result['queries'] > budget:
+                failures.append(f'{size} {name}: {result["queries"]} queries, budget is {budget}')
+            if previous and name in previous and result['queries'] > previous[name]['queries']:
+                failures.append(
+                    f'{size} {name}: {result["queries"]} queries, more than the '
+                    f'{previous[name]["queries"]} on a smaller dataset')
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            if result['queries'] > base['queries']:
+                failures.append(f'{size} {name}: {result["queries"]} queries, baseline is {base["queries"]}')
+            # The median, with a millisecond of slack, so a single slow
+            # request or the fastest routes do not fail the run on noise.
+            if tolerance is not None and result['p50'] > base['p50'] * tolerance + 1:
+                failures.append(f'{size} {name}: p50 {result["p50"]}ms, baseline is {base["p50"]}ms')
+        previous = routes
+    return failures
+
+
+def report(results):
+    print(f'{"size":8} {"route":18} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8}')
+    for size, routes in results.items():
+        for name, result in routes.items():
+            print(f'{size:8} {name:18} {result["p50"]:8.2f} {result["p95"]:8.2f} '
+                  f'{result["p99"]:8.2f} {result["queries"]:8d}')
+
+
+def bench_datetime(count, repeat):
+    # Per-call cost of the ``datetime`` template filter over the start times
+    # of ``count`` seeded shows: Babel called directly as the filter used
+    # to, then the filter with an empty and with a warm cache.
+    import babel.dates
+
+    from helpers import DATETIME_FORMATS, format_datetime
+    from seed import Catalog
+
+    times = [row['start_time'] for row in Catalog(count // 10 or 1, count // 5 or 1, count).show_rows()]
+    pattern = DATETIME_FORMATS['full']
+
+    def babel_direct():
+        for value in times:
+            babel.dates.format_datetime(value, pattern, locale='en')
+
+    def cold():
+        format_datetime.cache_clear()
+        for value in times:
+            format_datetime(value, 'full')
+
+    def warm():
+        for value in times:
+            format_datetime(value, 'full')
+
+    print(f'{count} show start times, {len(set(times))} distinct')
+    print(f'{"formatter":18} {"us/call":>8} {"ms/run":>8}')
+    for name, run in (('babel', babel_direct), ('filter, cold', cold), ('filter, warm', warm)):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            samples.append(time.perf_counter() - started)
+        best = min(samples)
+        print(f'{name:18} {best / len(times) * 1e6:8.2f} {best * 1000:8.2f}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='small,medium',
+                        help=f'comma separated dataset sizes out of {", ".join(SIZES)}')
+    parser.add_argument('--repeat', type=int, default=30, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=3, help='unmeasured requests per route first')
+    parser.add_argument('--latency', action='store_true',
+                        help='also fail on median latency growth over the baseline, '
+                             'which must come from this machine')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='allowed median latency growth over the baseline, as a factor')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline JSON file')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='record this run as the new baseline instead of checking it')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    parser.add_argument('--datetime', type=int, metavar='SHOWS', nargs='?', const=10000,
+                        help='only time the datetime template filter over this many show start times')
+    args = parser.parse_args(argv)
+
+    if args.datetime:
+        bench_datetime(args.datetime, 5)
+        return 0
+
+    sizes = args.sizes.split(',')
+    unknown = set(sizes) - set(SIZES)
+    if unknown:
+        parser.error(f'unknown sizes: {", ".join(sorted(unknown))}')
+
+    # Measure the views themselves, not the page cache, and never touch the
+    # configured database or slow query log. Debug mode is off as in
+    # production, where detail pages also read their version stamp.
+    os.environ['DEBUG'] = 'false'
+    os.environ['CACHE_TYPE'] = 'null'
+    os.environ['SLOW_QUERY_THRESHOLD_MS'] = '0'
+    os.environ.setdefault('DB_URL', 'sqlite://')
+    from app import create_app
+    app = create_app()
+    # After the app is built: importing flask_wtf resets its warning filter.
+    warnings.filterwarnings('ignore', message='"flask_wtf.Form" has been renamed')
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            results[size] = run_size(app, size, directory, args.repeat, args.warmup)
+    report(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'baseline written to {args.baseline}')
+        failures = check(results, {})
+    else:
+        failures = check(results, baseline, args.tolerance if args.latency else None)
+    for failure in failures:
+        print(f'FAIL {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
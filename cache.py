@@ -0,0 +1,311 @@
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, request, session
+
+from routing import reads_from_replica
+
+
+def new_tag_version():
+    # A unique tag version that records when it was made.
+    return f'{time.time():.6f}:{uuid.uuid4().hex}'
+
+
+def tag_version_time(version):
+    # When ``version`` was made; 0 for a tag never invalidated.
+    return float(version.partition(':')[0] or 0)
+
+
+class MemoryBackend:
+    """Per-process LRU store with per-entry expiry.
+
+    Only suitable for a single worker: invalidations made by one process are
+    not seen by the others.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires):
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_tag(self, tag):
+        return self._tags.get(tag, '')
+
+    def bump_tag(self, tag):
+        self._tags[tag] = new_tag_version()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileSystemBackend:
+    """LRU store in a directory shared by every worker on the host.
+
+    Entries and tag versions are written to a temporary file and renamed into
+    place, so readers never see a partial write. An entry's mtime is touched
+    on every hit and the least recently used files are pruned once the
+    directory grows past ``max_entries``.
+    """
+
+    prune_every = 100
+
+    def __init__(self, directory, max_entries):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries_dir = os.path.join(directory, 'entries')
+        self._tags_dir = os.path.join(directory, 'tags')
+        os.makedirs(self._entries_dir, exist_ok=True)
+        os.makedirs(self._tags_dir, exist_ok=True)
+        self._writes = 0
+
+    @staticmethod
+    def _name(key):
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    @staticmethod
+    def _write(path, data):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key):
+        path = os.path.join(self._entries_dir, self._name(key))
+        try:
+            with open(path, 'rb') as f:
+                expires, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires <= time.time():
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value, expires):
+        path = os.path.join(self._entries_dir, self._name(key))
+        self._write(path, pickle.dumps((expires, value), pickle.HIGHEST_PROTOCOL))
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune()
+
+    def prune(self):
+        paths = []
+        for entry in os.scandir(self._entries_dir):
+            try:
+                paths.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                continue
+        surplus = len(paths) - self.max_entries
+        if surplus > 0:
+            for _, path in sorted(paths)[:surplus]:
+                self._remove(path)
+                self.evictions += 1
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get_tag(self, tag):
+        try:
+            with open(os.path.join(self._tags_dir, self._name(tag))) as f:
+                return f.read()
+        except OSError:
+            return ''
+
+    def bump_tag(self, tag):
+        self._write(os.path.join(self._tags_dir, self._name(tag)), new_tag_version().encode())
+
+    def clear(self):
+        for directory in (self._entries_dir, self._tags_dir):
+            for entry in os.scandir(directory):
+                self._remove(entry.path)
+
+    def __len__(self):
+        return sum(1 for _ in os.scandir(self._entries_dir))
+
+
+class ResponseCache:
+    """Cache of rendered GET responses, invalidated by tags.
+
+    Views opt in with ``@response_cache.cached('venue:{venue_id}', ...)``;
+    tag templates are formatted with the view arguments. Each entry records
+    the version of its tags when the view started, and writes call
+    ``invalidate(tag, ...)`` to give those tags a new version, so an entry
+    rendered from data that changed is never served again.
+
+    Pages read from the replica within REPLICA_READ_YOUR_WRITES_SECONDS of
+    an invalidation of one of their tags are served but not stored, since
+    the replica may not show the change yet.
+
+    Requests that set ``g.cache_bypass`` always run the view. Coroutine
+    views (the async read path, see asgi.py) are cached the same way.
+
+    Configured by ``CACHE_TYPE`` ('null', 'memory' or 'filesystem'),
+    ``CACHE_DEFAULT_TIMEOUT`` (seconds), ``CACHE_MAX_ENTRIES`` and
+    ``CACHE_DIR``.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.timeout = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cache_type = app.config.get('CACHE_TYPE', 'null')
+        max_entries = app.config.get('CACHE_MAX_ENTRIES', 1000)
+        if cache_type == 'memory':
+            self.backend = MemoryBackend(max_entries)
+        elif cache_type == 'filesystem':
+            self.backend = FileSystemBackend(app.config['CACHE_DIR'], max_entries)
+        elif cache_type != 'null':
+            raise ValueError(f'Unknown CACHE_TYPE {cache_type!r}')
+        self.timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+        app.extensions['response_cache'] = self
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def cached(self, *tags):
+        def decorator(view):
+            if inspect.iscoroutinefunction(view):
+                @wraps(view)
+                async def async_wrapper(**kwargs):
+                    if not self._cacheable():
+                        return await view(**kwargs)
+                    key = f'view:{request.full_path}'
+                    response = self._hit(key)
+                    if response is not None:
+                        return response
+                    versions = self._miss(tags, kwargs)
+                    return self._store(key, versions, await view(**kwargs))
+                return async_wrapper
+
+            @wraps(view)
+            def wrapper(**kwargs):
+                if not self._cacheable():
+                    return view(**kwargs)
+                key = f'view:{request.full_path}'
+                response = self._hit(key)
+                if response is not None:
+                    return response
+                versions = self._miss(tags, kwargs)
+                return self._store(key, versions, view(**kwargs))
+            return wrapper
+        return decorator
+
+    def _cacheable(self):
+        return not (self.backend is None or request.method != 'GET' or '_flashes' in session
+                    or g.get('cache_bypass'))
+
+    def _hit(self, key):
+        entry = self.backend.get(key)
+        if entry is None or not all(
+                self.backend.get_tag(tag) == version for tag, version in entry['tags'].items()):
+            return None
+        self.hits += 1
+        body, status, headers = entry['response']
+        response = current_app.response_class(body, status, headers)
+        response.headers['X-Cache'] = 'HIT'
+        return response
+
+    def _miss(self, tags, kwargs):
+        # The current versions of the entry's tags, taken before the view runs.
+        self.misses += 1
+        g.cache_expires = time.time() + self.timeout
+        return {tag: self.backend.get_tag(tag) for tag in (tag.format(**kwargs) for tag in tags)}
+
+    def _store(self, key, versions, rv):
+        response = current_app.make_response(rv)
+        if (response.status_code == 200 and 'Set-Cookie' not in response.headers
+                and not self._replica_behind(versions)):
+            self.backend.set(key, {
+                'tags': versions,
+                'response': (
+                    response.get_data(), response.status_code,
+                    {'Content-Type': response.headers['Content-Type']})
+            }, g.cache_expires)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    def _replica_behind(self, versions):
+        # Whether the page was read from a replica that may not have caught
+        # up yet with the latest invalidation of one of its tags; storing it
+        # would serve the old data under the new version.
+        if not reads_from_replica(current_app):
+            return False
+        since = time.time() - current_app.config.get('REPLICA_READ_YOUR_WRITES_SECONDS', 10)
+        return any(tag_version_time(version) > since for version in versions.values())
+
+    def expire_at(self, when):
+        # Cap the lifetime of the response being rendered at the Unix time
+        # ``when``, e.g. when an upcoming show on the page becomes a past one.
+        if 'cache_expires' in g:
+            g.cache_expires = min(g.cache_expires, when)
+
+    def invalidate(self, *tags):
+        if self.backend is None:
+            return
+        for tag in set(tags):
+            self.backend.bump_tag(tag)
+        self.invalidations += 1
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        return {
+            'type': type(self.backend).__name__ if self.backend else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'evictions': self.backend.evictions if self.backend else 0,
+            'entries': len(self.backend) if self.backend else 0,
+        }
@@ -0,0 +1,203 @@
+import os
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func
+
+from assets import build_assets
+from extensions import db, response_cache
+from forms import ArtistForm, ShowForm, VenueForm
+from importer import Bookings, BulkImporter, Entity, deferred_indexes
+from models import (
+    SHOW_TABLES, Artist, Genre, Show, ShowListing, Venue, archive_shows, artiste_genre, list_shows_after,
+    refresh_show_counters, refresh_show_listing, rollover_show_counters, touch_all, venue_genre
+)
+from seed import Catalog
+from slowlog import TopQueries, log_path, read_log
+
+cli = AppGroup('fyyur', help='Fyyur maintenance commands.')
+
+
+def invalidate_pages(*tags):
+    # Drop the cached pages carrying ``tags``, or all of them without tags.
+    # A memory cache lives in each web worker, out of this process's reach.
+    if current_app.config['CACHE_TYPE'] == 'memory':
+        click.echo('warning: CACHE_TYPE is memory, so the web workers keep serving '
+                   'their cached pages until these expire or the workers restart', err=True)
+    elif tags:
+        response_cache.invalidate(*tags)
+    else:
+        response_cache.clear()
+
+
+@cli.command('build-assets')
+def build_assets_command():
+    """Bundle, fingerprint and precompress the CSS and JS under static/."""
+    manifest = build_assets(current_app.static_folder, current_app.config['ASSETS_DIR'])
+    for name, hashed in manifest.items():
+        click.echo(f'{name} -> {hashed}')
+
+
+@cli.command('rollover-shows')
+def rollover_shows():
+    """Move shows that have started from the upcoming to the past counters."""
+    moved = rollover_show_counters()
+    if moved:
+        invalidate_pages('venues', 'artists')
+    click.echo(f'{moved} shows moved from upcoming to past')
+
+
+@cli.command('recount-shows')
+def recount_shows():
+    """Recount every venue's and artist's past and upcoming shows."""
+    refresh_show_counters()
+    db.session.commit()
+    click.echo('show counters refreshed')
+
+
+@cli.command('relist-shows')
+def relist_shows():
+    """Rebuild the show_listing table behind /shows from the shows."""
+    refresh_show_listing()
+    db.session.commit()
+    invalidate_pages('shows')
+    click.echo('show listing rebuilt')
+
+
+@cli.command('archive-shows')
+@click.option('--days', type=int, help='Archive shows that started more than this many days ago; '
+                                       'defaults to SHOW_ARCHIVE_AFTER_DAYS.')
+@click.option('--batch-size', default=10000, show_default=True, help='Shows moved per transaction.')
+def archive_shows_command(days, batch_size):
+    """Move long past shows from the show table to show_archive."""
+    if days is None:
+        days = current_app.config['SHOW_ARCHIVE_AFTER_DAYS']
+    moved = archive_shows(datetime.now() - timedelta(days=days), batch_size=batch_size)
+    click.echo(f'{moved} shows archived')
+
+
+@cli.command('slow-queries')
+@click.option('--log', 'path', help='Slow query log to read; defaults to SLOW_QUERY_LOG.')
+@click.option('--top', type=int, help='Number of statements to list; defaults to SLOW_QUERY_TOP.')
+@click.option('--plans', is_flag=True, help='Print the plan of each statement\'s worst run.')
+def slow_queries(path, top, plans):
+    """List the slowest statements of the slow query log and its backups."""
+    path = path or log_path(current_app)
+    paths = [path] + [f'{path}.{n}' for n in range(1, current_app.config.get('SLOW_QUERY_LOG_BACKUPS', 5) + 1)]
+    table = TopQueries(top or current_app.config.get('SLOW_QUERY_TOP', 20))
+    for record in read_log([p for p in paths if os.path.exists(p)]):
+        table.add(record)
+    entries = table.entries()
+    if not entries:
+        click.echo('no slow queries logged')
+    for entry in entries:
+        click.echo(
+            f'{entry["max_ms"]:10.1f}ms max {entry["total_ms"]:10.1f}ms total {entry["count"]:6d}x  '
+            f'{entry["route"] or "-"}')
+        click.echo(f'    {entry["sql"]}')
+        if plans and entry.get('plan'):
+            for line in entry['plan']:
+                click.echo(f'      {line}')
+
+
+VENUE_ENTITY = Entity('venue', Venue.__table__, VenueForm, venue_genre, 'venue_id')
+ARTIST_ENTITY = Entity('artist', Artist.__table__, ArtistForm, artiste_genre, 'artist_id')
+SHOW_ENTITY = Entity('show', Show.__table__, ShowForm, None, None)
+
+
+@cli.command('import')
+@click.option('--venues', multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help='CSV or JSONL file of venues; may be repeated.')
+@click.option('--artists', multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help='CSV or JSONL file of artists; may be repeated.')
+@click.option('--shows', multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help='CSV or JSONL file of shows; may be repeated.')
+@click.option('--batch-size', default=50000, show_default=True,
+              help='Rows written per transaction.')
+@click.option('--jobs', default=os.cpu_count() or 1, show_default='number of CPUs',
+              help='Processes validating rows.')
+def import_catalog(venues, artists, shows, batch_size, jobs):
+    """Bulk load venues, artists and shows from CSV or JSONL files.
+
+    Rows are validated with the same forms as the create pages; rows that
+    fail are reported and skipped. Venue and artist rows may give an "id"
+    that show rows refer to as venue_id/artist_id. Genres are a list or a
+    comma separated string. Shows that would double book a venue or an
+    artist, against the existing shows or earlier rows, are rejected like
+    on the show form. The show and show_listing indexes are rebuilt after
+    loading shows, so pages reading shows are slow until the import ends.
+    """
+    importer = BulkImporter(db.engine, Genre.__table__, batch_size=batch_size, jobs=jobs)
+    bookings = Bookings(db.engine, [model.__table__ for model in SHOW_TABLES],
+                        timedelta(minutes=current_app.config['SHOW_DURATION_MINUTES']))
+    last_show_id = db.session.query(func.max(Show.id)).scalar() or 0
+    db.session.commit()
+    for path in venues:
+        importer.import_file(path, VENUE_ENTITY)
+    for path in artists:
+        importer.import_file(path, ARTIST_ENTITY)
+    with deferred_indexes(db.engine, *((Show.__table__, ShowListing.__table__) if shows else ())):
+        for path in shows:
+            importer.import_file(
+                path, SHOW_ENTITY, (('venue_id', Venue.__table__), ('artist_id', Artist.__table__)), bookings)
+        list_shows_after(last_show_id)
+        db.session.commit()
+
+    refresh_show_counters()
+    touch_all()
+    db.session.commit()
+    invalidate_pages()
+
+    for error in importer.errors:
+        click.echo(f'{error.path}:{error.line}: {error.message}', err=True)
+    click.echo((', '.join(
+        f'{count} {name} rows' for name, count in importer.inserted.items()) or 'nothing') + ' imported')
+    if importer.errors:
+        raise click.ClickException(f'{len(importer.errors)} rows were rejected')
+
+
+@cli.command('seed')
+@click.option('--venues', default=1000, show_default=True, help='Number of venues.')
+@click.option('--artists', default=2000, show_default=True, help='Number of artists.')
+@click.option('--shows', default=50000, show_default=True, help='Number of shows.')
+@click.option('--seed', default=0, show_default=True, help='Random seed; the same seed gives the same catalog.')
+@click.option('--future', default=0.2, show_default=True, help='Fraction of shows that are upcoming.')
+@click.option('--batch-size', default=10000, show_default=True, help='Rows written per transaction.')
+def seed_catalog(venues, artists, shows, seed, future, batch_size):
+    """Add a synthetic catalog of venues, artists and shows for scale testing.
+
+    Rows are generated deterministically from --seed and numbered after the
+    existing ones, so seeding an empty database twice with the same options
+    gives the same data. Shows only refer to the venues and artists added.
+    """
+    if shows and not (venues and artists):
+        raise click.UsageError('shows need at least one venue and one artist')
+    try:
+        inserted = seed_database(venues, artists, shows, seed=seed, future=future, batch_size=batch_size)
+    except ValueError as error:
+        raise click.UsageError(str(error))
+    click.echo(', '.join(f'{count} {name} rows' for name, count in inserted.items()) + ' seeded')
+
+
+def seed_database(venues, artists, shows, batch_size=10000, **options):
+    # Insert a generated Catalog after the existing rows; returns the
+    # number of rows inserted per entity.
+    catalog = Catalog(
+        venues, artists, shows, **options,
+        show_duration=current_app.config['SHOW_DURATION_MINUTES'],
+        first_venue_id=(db.session.query(func.max(Venue.id)).scalar() or 0) + 1,
+        first_artist_id=(db.session.query(func.max(Artist.id)).scalar() or 0) + 1)
+    db.session.commit()
+
+    importer = BulkImporter(db.engine, Genre.__table__, batch_size=batch_size)
+    importer.load(VENUE_ENTITY, catalog.venue_rows())
+    importer.load(ARTIST_ENTITY, catalog.artist_rows())
+    importer.load(SHOW_ENTITY, ((record, None) for record in catalog.show_rows()))
+
+    refresh_show_counters()
+    refresh_show_listing()
+    db.session.commit()
+    invalidate_pages()
+    return importer.inserted
@@ -5,12 +5,15 @@ env = environ.Env()
 
 env.read_env()
 
-SECRET_KEY = os.urandom(32)
+# Sessions and flashed messages are signed with SECRET_KEY, so every worker
+# must share it: set it in the environment. The random fallback is only
+# shared by workers forked from a preloaded master.
+SECRET_KEY = env('SECRET_KEY', default=None) or os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 # Enable debug mode.
-DEBUG = True
+DEBUG = env.bool('DEBUG', default=True)
 
 # Connect to the database
 
@@ -18,4 +21,113 @@ DEBUG = True
 # TODO IMPLEMENT DATABASE URL
 SQLALCHEMY_DATABASE_URI = env("DB_URL")
 
+# Connection pool of each worker process, so workers * (DB_POOL_SIZE +
+# DB_MAX_OVERFLOW) must stay under the server's max_connections. Pooled
+# connections are pinged before use and replaced after DB_POOL_RECYCLE
+# seconds; DB_STATEMENT_TIMEOUT_MS (Postgres, 0 for none) cancels runaway
+# statements. SQLite only takes the ping and recycle settings.
+DB_POOL_SIZE = env.int('DB_POOL_SIZE', default=5)
+DB_MAX_OVERFLOW = env.int('DB_MAX_OVERFLOW', default=5)
+DB_POOL_TIMEOUT = env.int('DB_POOL_TIMEOUT', default=10)
+DB_POOL_RECYCLE = env.int('DB_POOL_RECYCLE', default=1800)
+DB_POOL_PRE_PING = env.bool('DB_POOL_PRE_PING', default=True)
+DB_STATEMENT_TIMEOUT_MS = env.int('DB_STATEMENT_TIMEOUT_MS', default=30000)
+
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_pre_ping': DB_POOL_PRE_PING,
+    'pool_recycle': DB_POOL_RECYCLE,
+}
+if not SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+    SQLALCHEMY_ENGINE_OPTIONS.update(
+        pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+if SQLALCHEMY_DATABASE_URI.startswith('postgres') and DB_STATEMENT_TIMEOUT_MS:
+    SQLALCHEMY_ENGINE_OPTIONS['connect_args'] = {
+        'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'}
+
+# Optional read replica with the same schema. Queries of GET requests go to
+# it; writes, and a browser's reads for REPLICA_READ_YOUR_WRITES_SECONDS
+# after it wrote, go to the primary. Other visitors may see the replica's
+# lag, but pages it renders in that window after a change are not cached, so
+# REPLICA_READ_YOUR_WRITES_SECONDS should cover the replica's worst lag.
+DB_REPLICA_URL = env('DB_REPLICA_URL', default=None)
+SQLALCHEMY_BINDS = {'replica': DB_REPLICA_URL} if DB_REPLICA_URL else {}
+REPLICA_READ_YOUR_WRITES_SECONDS = env.int('REPLICA_READ_YOUR_WRITES_SECONDS', default=10)
+
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Number of results per page on the venue and artist search pages.
+SEARCH_PAGE_SIZE = 20
+
+# Default and maximum number of rows per page on the /venues, /artists and
+# /shows listings; clients may pick a size up to the maximum with ?per_page=.
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Number of values listed per genre/state/city facet on /venues and /artists.
+FACET_LIMIT = 20
+
+# Longest date range of a venue or artist calendar page, in days.
+CALENDAR_MAX_DAYS = 366
+
+# How long a show is taken to last when new shows are checked for double
+# bookings of their venue or artist.
+SHOW_DURATION_MINUTES = env.int('SHOW_DURATION_MINUTES', default=120)
+
+# `flask fyyur archive-shows`, run periodically, moves shows that started
+# more than SHOW_ARCHIVE_AFTER_DAYS ago out of the show table.
+SHOW_ARCHIVE_AFTER_DAYS = env.int('SHOW_ARCHIVE_AFTER_DAYS', default=90)
+
+# Rendered-page cache for the listing and detail routes: 'null' disables it,
+# 'filesystem' shares it between the workers on a host through CACHE_DIR and
+# 'memory' keeps it per process, which only suits a single process such as
+# `flask run`: another worker's writes never invalidate its pages.
+CACHE_TYPE = env('CACHE_TYPE', default='filesystem')
+CACHE_DIR = env('CACHE_DIR', default=os.path.join(basedir, '.cache', 'pages'))
+CACHE_DEFAULT_TIMEOUT = env.int('CACHE_DEFAULT_TIMEOUT', default=300)
+CACHE_MAX_ENTRIES = env.int('CACHE_MAX_ENTRIES', default=1000)
+
+# Rows fetched per round trip when the JSON API streams a whole collection.
+API_STREAM_BATCH = 1000
+
+# Per-request query counts and timings, sent as Server-Timing headers and
+# aggregated on /metrics for Prometheus.
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+
+# Statements slower than SLOW_QUERY_THRESHOLD_MS (0, the default, disables
+# the log) are written with their EXPLAIN plan to the rotating
+# SLOW_QUERY_LOG, by default slow_queries.log in the instance folder; EXPLAIN
+# ANALYZE re-runs the statement on Postgres. The worst SLOW_QUERY_TOP
+# statements are listed by /stats/slow-queries and `flask fyyur slow-queries`.
+SLOW_QUERY_THRESHOLD_MS = env.float('SLOW_QUERY_THRESHOLD_MS', default=0)
+SLOW_QUERY_EXPLAIN_ANALYZE = env.bool('SLOW_QUERY_EXPLAIN_ANALYZE', default=False)
+SLOW_QUERY_LOG = env('SLOW_QUERY_LOG', default=None)
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+SLOW_QUERY_TOP = 20
+
+# Requests with ?__profile=1 and the PROFILER_TOKEN run under cProfile; the
+# stats and a JSON summary are saved to PROFILER_DIR.
+PROFILER_ENABLED = env.bool('PROFILER_ENABLED', default=False)
+PROFILER_TOKEN = env('PROFILER_TOKEN', default=None)
+PROFILER_DIR = env('PROFILER_DIR', default=os.path.join(basedir, '.cache', 'profiles'))
+
+# Compiled templates are stored in TEMPLATE_CACHE_DIR, shared by workers and
+# kept across restarts, and with TEMPLATE_WARMUP every template is loaded
+# when the app is created, so a new worker's first requests do not compile
+# them. Outside debug mode templates are not checked for changes on disk.
+TEMPLATE_CACHE_DIR = env('TEMPLATE_CACHE_DIR', default=os.path.join(basedir, '.cache', 'templates'))
+TEMPLATE_WARMUP = env.bool('TEMPLATE_WARMUP', default=True)
+TEMPLATES_AUTO_RELOAD = DEBUG
+
+# Bundled, content-hashed CSS and JS written by `flask fyyur build-assets`
+# and served from /assets; without a build the source files under /static
+# are linked instead.
+ASSETS_DIR = env('ASSETS_DIR', default=os.path.join(basedir, 'static', 'dist'))
+
+# Venue and artist pages carry an ETag built from the row's updated_at stamp
+# and BUILD_VERSION, and revalidations that match get a 304. Set it to e.g.
+# the deployed commit to skip hashing the sources at startup; by default it
+# is a hash of the code, templates and asset manifest, so a deploy changing
+# any of them changes every ETag. While templates are reloaded pages get no
+# ETag and the default is 'dev'.
+BUILD_VERSION = env('BUILD_VERSION', default=None)
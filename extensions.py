@@ -0,0 +1,18 @@
+# Extension instances shared by the blueprints; create_app() binds them to
+# the application.
+
+from assets import Assets
+from asyncdb import AsyncDatabase
+from cache import ResponseCache
+from metrics import Metrics
+from profiler import RequestProfiler
+from routing import RoutingSQLAlchemy
+from slowlog import SlowQueryLog
+
+db = RoutingSQLAlchemy()
+async_db = AsyncDatabase()
+response_cache = ResponseCache()
+metrics = Metrics()
+slow_query_log = SlowQueryLog()
+profiler = RequestProfiler()
+assets = Assets()
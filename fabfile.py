@@ -6,10 +6,8 @@ from fabric.contrib.console import confirm
 
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
-    if result.failed and not confirm("Tests failed. Continue?"):
+        result = local("python bench.py", capture=True)
+    if result.failed and not confirm("Benchmarks failed. Continue?"):
         abort("Aborted at user request.")
 
 
@@ -39,9 +37,7 @@ def heroku():
 
 
 def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+    local("heroku run python bench.py --sizes small")
 
 
 def deploy():
@@ -4,8 +4,6 @@ from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField
 from wtforms.validators import DataRequired, AnyOf, URL
 from wtforms import ValidationError
 
-import phonenumbers
-from phonenumbers.phonenumberutil import NumberParseException
 
 state_choices = [
             ('AL', 'AL'),
@@ -85,6 +83,11 @@ genre_choices = [
 
 
 def phonenumber_validator(form, field):
+    # phonenumbers is imported on first use; loading it costs every worker
+    # startup time and memory even if no form is ever submitted.
+    import phonenumbers
+    from phonenumbers.phonenumberutil import NumberParseException
+
     try:
         phone_number = phonenumbers.parse(field.data, "US")
         if not (phonenumbers.is_valid_number(phone_number)):
@@ -0,0 +1,551 @@
+import hashlib
+import inspect as pyinspect
+from datetime import date, datetime, timedelta
+from functools import lru_cache, wraps
+
+from flask import abort, current_app, render_template, request, session, url_for
+from sqlalchemy import column, func, inspect, literal, select, table, text, union_all
+
+from extensions import async_db, db, response_cache
+from models import (
+    Artist, Genre, Show, ShowArchive, ShowListing, Venue, artiste_genre, show_partners, venue_genre
+)
+
+# ----------------------------------------------------------------------------#
+# Filters.
+# ----------------------------------------------------------------------------#
+
+
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format):
+    # The parsed Babel pattern of a format name or pattern, and the locale,
+    # built once per format. babel and dateutil are imported on first use so
+    # that processes which never render a date do not load them.
+    import babel.dates
+    from babel import Locale
+
+    return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), Locale.parse('en')
+
+
+@lru_cache(maxsize=16384)
+def format_datetime(value, format='medium'):
+    # Pages list many shows at the same few start times, so formatted
+    # values are kept in a bounded LRU keyed by (value, format).
+    import babel.dates
+
+    date = value
+    if isinstance(value, str):
+        import dateutil.parser
+
+        date = dateutil.parser.parse(value)
+    pattern, locale = datetime_pattern(format)
+    return babel.dates.format_datetime(date, pattern, locale=locale)
+
+
+# ----------------------------------
+# Helpers
+# ----------------------------------
+
+def get_genres(names):
+    # Genre rows for ``names``, creating any that do not exist yet.
+    if not names:
+        return []
+    genres = Genre.query.filter(Genre.name.in_(names)).all()
+    known = {genre.name for genre in genres}
+    genres.extend(Genre(name=name) for name in dict.fromkeys(names) if name not in known)
+    return genres
+
+
+def facet_args():
+    # Active genre/state/city filters of a listing route, from the query string.
+    return {facet: request.args.get(facet) or None for facet in FACETS}
+
+
+def page_url(**cursor):
+    # URL of another page of the current listing, keeping its filters.
+    args = request.args.to_dict()
+    args.pop('after', None)
+    args.pop('before', None)
+    args.update(cursor)
+    return url_for(request.endpoint, **args)
+
+
+def facet_url(facet, value=None):
+    # URL of the current listing with ``facet`` set to ``value`` (or cleared),
+    # starting again from the first page.
+    args = {key: val for key, val in request.args.items() if key not in ('after', 'before', facet)}
+    if value is not None:
+        args[facet] = value
+    return url_for(request.endpoint, **args)
+
+
+def page_args():
+    # Keyset pagination arguments for listing routes, from the query string.
+    per_page = request.args.get('per_page', current_app.config['PAGE_SIZE'], type=int)
+    return {
+        'per_page': min(max(per_page, 1), current_app.config['MAX_PAGE_SIZE']),
+        'after': request.args.get('after'),
+        'before': request.args.get('before')
+    }
+
+
+# ----------------------------------------------------------------------------#
+# Facets.
+# ----------------------------------------------------------------------------#
+
+FACETS = ('genre', 'state', 'city')
+
+GENRE_TABLES = {
+    Venue: venue_genre,
+    Artist: artiste_genre,
+}
+
+
+def facet_criteria(model, filters, exclude=None):
+    # WHERE criteria on ``model`` for the active facet filters, leaving out
+    # the ``exclude`` facet.
+    criteria = []
+    for facet, value in filters.items():
+        if value is None or facet == exclude:
+            continue
+        if facet == 'genre':
+            secondary = GENRE_TABLES[model]
+            criteria.append(model.id.in_(
+                select(secondary.c[f'{model.__tablename__}_id']).join(
+                    Genre, Genre.id == secondary.c.genre_id
+                ).where(Genre.name == value)
+            ))
+        else:
+            criteria.append(getattr(model, facet) == value)
+    return criteria
+
+
+def facet_counts(model, filters):
+    """Per-value counts for every facet of ``model``, in one statement.
+
+    Each facet is counted under the other active filters (but not its own),
+    so the listing shows how many rows choosing a different value would give.
+    Returns ``{facet: [(value, count), ...]}`` with the FACET_LIMIT largest
+    values per facet.
+    """
+    return group_facet_counts(db.session.execute(facet_counts_query(model, filters)))
+
+
+def facet_counts_query(model, filters):
+    # The (facet, value, count) statement behind facet_counts().
+    secondary = GENRE_TABLES[model]
+    limit = current_app.config['FACET_LIMIT']
+    genre_counts = select(
+        literal('genre').label('facet'), Genre.name.label('value'), func.count().label('count')
+    ).select_from(
+        secondary.join(Genre, Genre.id == secondary.c.genre_id).join(
+            model, model.id == secondary.c[f'{model.__tablename__}_id'])
+    ).where(*facet_criteria(model, filters, exclude='genre')).group_by(Genre.name)
+    selects = [genre_counts]
+    for facet in ('state', 'city'):
+        column = getattr(model, facet)
+        selects.append(select(
+            literal(facet).label('facet'), column.label('value'), func.count().label('count')
+        ).where(column.isnot(None), *facet_criteria(model, filters, exclude=facet)).group_by(column))
+    subqueries = [
+        statement.order_by(text('count DESC'), text('value')).limit(limit).subquery()
+        for statement in selects
+    ]
+    return union_all(*[select(subquery) for subquery in subqueries])
+
+
+def group_facet_counts(rows):
+    counts = {facet: [] for facet in FACETS}
+    for row in rows:
+        counts[row.facet].append((row.value, row.count))
+    return counts
+
+
+# ----------------------------------------------------------------------------#
+# Cache invalidation.
+# ----------------------------------------------------------------------------#
+
+# Cached pages are tagged 'venues', 'artists' and 'shows' for the listings and
+# 'venue:<id>' / 'artist:<id>' for the detail pages. A venue's name and image
+# also appear on /shows and on the pages of the artists playing there (and
+# the other way round), and the listings show upcoming-show counts.
+
+
+def invalidate_venue(venue_id, artist_ids=None):
+    if not response_cache.enabled:
+        return
+    if artist_ids is None:
+        artist_ids = [artist_id for (artist_id,) in db.session.execute(show_partners('venue_id', venue_id))]
+    response_cache.invalidate(
+        'venues', 'shows', f'venue:{venue_id}', *[f'artist:{artist_id}' for artist_id in artist_ids])
+
+
+def invalidate_artist(artist_id):
+    if not response_cache.enabled:
+        return
+    venue_ids = [venue_id for (venue_id,) in db.session.execute(show_partners('artist_id', artist_id))]
+    response_cache.invalidate(
+        'artists', 'shows', f'artist:{artist_id}', *[f'venue:{venue_id}' for venue_id in venue_ids])
+
+
+def invalidate_show(show):
+    response_cache.invalidate(
+        'venues', 'artists', 'shows', f'venue:{show.venue_id}', f'artist:{show.artist_id}')
+
+
+# ----------------------------------------------------------------------------#
+# Conditional requests.
+# ----------------------------------------------------------------------------#
+
+# A detail page is a function of its venue's or artist's updated_at stamp
+# (see "Page versions" in models.py), of which of its shows have started and
+# of the code and templates that render it (BUILD_VERSION). Its ETag is a hash
+# of those, read with one indexed query before the page is built.
+
+SHOW_COLUMNS = {
+    Venue: Show.venue_id,
+    Artist: Show.artist_id,
+}
+
+
+def page_version_query(model, ident, now=None):
+    # (updated_at, start time of the next upcoming show) of one venue or
+    # artist; the second column changes when that show starts.
+    now = now or datetime.now()
+    show_column = SHOW_COLUMNS[model]
+    next_show = select(func.min(Show.start_time)).where(
+        show_column == ident, Show.start_time >= now).scalar_subquery()
+    return select(model.updated_at, next_show).where(model.id == ident)
+
+
+def page_etag(row):
+    stamp = '|'.join([current_app.config['BUILD_VERSION'], *(str(value) for value in row)])
+    return hashlib.sha1(stamp.encode()).hexdigest()
+
+
+def _conditional_request():
+    # Pages rendered with flashed messages get no ETag, or the client would
+    # keep showing the messages from its copy.
+    return (request.method in ('GET', 'HEAD') and '_flashes' not in session
+            and not current_app.templates_auto_reload)
+
+
+def _not_modified(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def _with_etag(etag, rv):
+    response = current_app.make_response(rv)
+    if response.status_code == 200:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def conditional(model, arg):
+    """Give a ``model`` detail page an ETag, and answer a matching
+    If-None-Match with a 304 without running the view.
+
+    ``arg`` names the view argument holding the primary key; an unknown key
+    runs the view, which answers 404. Applies to sync and coroutine views.
+    Turned off while templates are reloaded from disk (debug mode), since
+    their changes are not part of BUILD_VERSION.
+    """
+    def decorator(view):
+        if pyinspect.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(**kwargs):
+                if not _conditional_request():
+                    return await view(**kwargs)
+                rows = await async_db.all(page_version_query(model, kwargs[arg]))
+                if not rows:
+                    return await view(**kwargs)
+                etag = page_etag(rows[0])
+                if request.if_none_match.contains(etag):
+                    return _not_modified(etag)
+                return _with_etag(etag, await view(**kwargs))
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(**kwargs):
+            if not _conditional_request():
+                return view(**kwargs)
+            row = db.session.execute(page_version_query(model, kwargs[arg])).first()
+            if row is None:
+                return view(**kwargs)
+            etag = page_etag(row)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            return _with_etag(etag, view(**kwargs))
+        return wrapper
+    return decorator
+
+
+# ----------------------------------------------------------------------------#
+# Search.
+# ----------------------------------------------------------------------------#
+
+_fts_tables = {}
+
+
+def has_fts_table(model, bind=None):
+    # Whether the SQLite trigram FTS table for ``model`` exists; looked up
+    # once, on ``bind`` if given.
+    name = f'{model.__tablename__}_fts'
+    if name not in _fts_tables:
+        _fts_tables[name] = inspect(bind if bind is not None else db.engine).has_table(name)
+    return _fts_tables[name]
+
+
+def search_query(search_term, content_type=Venue):
+    # Lightweight (id, name, upcoming_shows_count, total) rows for names
+    # containing search_term.
+    # ``total`` is a window count so one statement yields both the page and
+    # the overall number of matches.
+    pattern = f"%{search_term}%"
+    _query = db.session.query(
+        content_type.id, content_type.name, content_type.upcoming_shows_count,
+        func.count().over().label('total'))
+    if db.engine.dialect.name == 'sqlite' and has_fts_table(content_type):
+        # No ESCAPE clause: FTS5 only answers LIKE from the trigram index
+        # without one.
+        fts = table(f'{content_type.__tablename__}_fts', column('rowid'), column('name'))
+        return _query.join(fts, fts.c.rowid == content_type.id).filter(fts.c.name.like(pattern))
+    return _query.filter(content_type.name.ilike(pattern))
+
+
+def search_serializer(search_term, content_type=Venue, page=1):
+    rows = []
+    if search_term:
+        rows = search_page_query(search_term, content_type, page).all()
+    return search_response(rows, page)
+
+
+def search_page_query(search_term, content_type=Venue, page=1):
+    per_page = current_app.config['SEARCH_PAGE_SIZE']
+    return search_query(search_term, content_type).order_by(
+        content_type.name, content_type.id
+    ).limit(per_page).offset((page - 1) * per_page)
+
+
+def search_response(rows, page):
+    per_page = current_app.config['SEARCH_PAGE_SIZE']
+    count = rows[0].total if rows else 0
+    return {
+        "count": count,
+        "data": [{
+            'id': row.id,
+            'name': row.name,
+            'num_upcoming_shows': row.upcoming_shows_count
+        } for row in rows],
+        "page": page,
+        "has_prev": page > 1,
+        "has_next": page * per_page < count
+    }
+
+
+# ----------------------------------------------------------------------------#
+# Shows.
+# ----------------------------------------------------------------------------#
+
+def shows_query(model=Show):
+    # Shows (or archived shows) joined to their venue and artist, loading
+    # only the columns the show tiles render so no row triggers a lazy load.
+    return db.session.query(
+        model.id.label('id'),
+        model.venue_id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link'),
+        model.artist_id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        model.start_time.label('start_time')
+    ).join(Venue, Venue.id == model.venue_id).join(Artist, Artist.id == model.artist_id)
+
+
+def show_listing_query():
+    # The same columns for /shows, read from show_listing (see models.py)
+    # without any join.
+    return db.session.query(
+        ShowListing.id,
+        ShowListing.venue_id,
+        ShowListing.venue_name,
+        ShowListing.venue_image_link,
+        ShowListing.artist_id,
+        ShowListing.artist_name,
+        ShowListing.artist_image_link,
+        ShowListing.start_time
+    )
+
+
+def entity_shows_query(key, ident, start=None, end=None):
+    # The shows whose ``key`` ('venue_id' or 'artist_id') is ``ident``,
+    # starting in [start, end) when given, by start time. Archived shows
+    # all started long ago, so they are only read for ranges reaching into
+    # the past.
+    queries = []
+    for model in (Show, ShowArchive) if start is None or start < datetime.now() else (Show,):
+        query = shows_query(model).filter(getattr(model, key) == ident)
+        if start is not None:
+            query = query.filter(model.start_time >= start)
+        if end is not None:
+            query = query.filter(model.start_time < end)
+        queries.append(query.statement)
+    shows = union_all(*queries).subquery() if len(queries) > 1 else queries[0].subquery()
+    return db.session.query(shows).order_by(shows.c.start_time, shows.c.id)
+
+
+def venue_shows_query(venue_id):
+    return entity_shows_query('venue_id', venue_id)
+
+
+def artist_shows_query(artist_id):
+    return entity_shows_query('artist_id', artist_id)
+
+
+def show_serializer(show):
+    data = {
+        'venue_id': show.venue_id,
+        'venue_name': show.venue_name,
+        'artist_id': show.artist_id,
+        'artist_name': show.artist_name,
+        'artist_image_link': show.artist_image_link,
+        'start_time': show.start_time,
+        'venue_image_link': show.venue_image_link
+    }
+    return data
+
+
+def split_shows(rows, now=None):
+    # Split show rows into (past, upcoming) serialized lists in one pass.
+    now = now or datetime.now()
+    past_shows, upcoming_shows = [], []
+    for show in rows:
+        if show.start_time < now:
+            past_shows.append(show_serializer(show))
+        else:
+            upcoming_shows.append(show_serializer(show))
+    return past_shows, upcoming_shows
+
+
+# ----------------------------------------------------------------------------#
+# Calendar.
+# ----------------------------------------------------------------------------#
+
+def next_month(day):
+    # The first day of the month after ``day``'s.
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def calendar_range():
+    """The [start, end) datetimes of a calendar request.
+
+    Taken from ``?month=YYYY-MM`` or from ``?start=YYYY-MM-DD`` and an
+    exclusive ``&end=YYYY-MM-DD`` (default: the first of the next month);
+    the current month without either. Malformed or too long ranges, and
+    ranges ending past the last date Python represents, are a 400.
+    """
+    try:
+        if request.args.get('start'):
+            start = date.fromisoformat(request.args['start'])
+            end = date.fromisoformat(request.args['end']) if request.args.get('end') else next_month(start)
+        else:
+            month = request.args.get('month')
+            start = datetime.strptime(month, '%Y-%m').date() if month else date.today().replace(day=1)
+            end = next_month(start)
+    except (ValueError, OverflowError):
+        abort(400)
+    if not start < end or (end - start).days > current_app.config['CALENDAR_MAX_DAYS']:
+        abort(400)
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+
+
+def calendar_query(model, ident, start, end):
+    # Shows of one venue or artist starting in [start, end), read as a range
+    # of the (venue_id, start_time) or (artist_id, start_time) index.
+    return entity_shows_query(SHOW_COLUMNS[model].key, ident, start, end)
+
+
+def calendar_serializer(rows, start, end):
+    # The range and its days that have shows, in order.
+    days = []
+    for show in rows:
+        day = show.start_time.date()
+        if not days or days[-1]['date'] != day:
+            days.append({'date': day, 'shows': []})
+        days[-1]['shows'].append(show_serializer(show))
+    return {'start': start.date(), 'end': end.date(), 'days': days}
+
+
+def calendar_links(start, end):
+    # URLs of the months before and after a month, or of the ranges of the
+    # same length before and after any other [start, end); None for a range
+    # past the dates Python represents.
+    try:
+        whole_month = start.day == 1 and end == next_month(start)
+    except OverflowError:
+        whole_month = False
+    span = end - start
+    if whole_month:
+        ranges = {
+            'prev': lambda: ((start - timedelta(days=1)).replace(day=1), start),
+            'next': lambda: (end, next_month(end)),
+        }
+    else:
+        ranges = {'prev': lambda: (start - span, start), 'next': lambda: (end, end + span)}
+    args = dict(request.view_args)
+    links = {}
+    for name, bounds in ranges.items():
+        try:
+            range_start, range_end = bounds()
+        except OverflowError:
+            links[name] = None
+            continue
+        if whole_month:
+            links[name] = url_for(request.endpoint, **args, month=f'{range_start.year:04d}-{range_start.month:02d}')
+        else:
+            links[name] = url_for(request.endpoint, **args, start=range_start.date(), end=range_end.date())
+    return links
+
+
+def render_calendar(entity, url):
+    # The calendar page of a venue or artist for the requested range.
+    start, end = calendar_range()
+    if not request.args:
+        # The default range is the current month, so the cached page
+        # expires when the month ends.
+        response_cache.expire_at(end.timestamp())
+    rows = calendar_query(type(entity), entity.id, start, end)
+    return render_template(
+        'pages/calendar.html', name=entity.name, url=url, calendar=calendar_serializer(rows, start, end),
+        last=end - timedelta(days=1), links=calendar_links(start, end))
+
+
+def booking_conflicts(venue_id, artist_id, start_time, exclude=None):
+    """Shows overlapping a show of the venue or the artist at ``start_time``.
+
+    Two shows overlap when they start less than SHOW_DURATION_MINUTES
+    apart. Each side is one bounded range scan of the (venue_id, start_time)
+    or (artist_id, start_time) index, of show_archive too for a show in the
+    past.
+    Returns (kind, start_time) rows, kind being 'venue' or 'artist'.
+    """
+    duration = timedelta(minutes=current_app.config['SHOW_DURATION_MINUTES'])
+    selects = []
+    for model in (Show, ShowArchive) if start_time - duration < datetime.now() else (Show,):
+        window = (model.start_time > start_time - duration, model.start_time < start_time + duration)
+        if exclude is not None and model is Show:
+            window += (model.id != exclude,)
+        selects += [
+            select(literal(kind).label('kind'), model.start_time).where(getattr(model, key) == ident, *window).limit(1)
+            for kind, key, ident in (('venue', 'venue_id', venue_id), ('artist', 'artist_id', artist_id))
+        ]
+    return db.session.execute(union_all(*[select(statement.subquery()) for statement in selects])).all()
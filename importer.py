@@ -0,0 +1,424 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+from bisect import bisect_left, insort
+from collections import namedtuple
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.datastructures import MultiDict
+
+# What to load a file into: the table, the form whose validators every row
+# must pass, and for venues/artists the genre association table and its
+# foreign key column.
+Entity = namedtuple('Entity', ['name', 'table', 'form', 'link_table', 'link_key'])
+
+RowError = namedtuple('RowError', ['path', 'line', 'message'])
+
+FALSE_VALUES = {'', '0', 'false', 'f', 'no', 'n', 'off'}
+
+
+def read_rows(path):
+    """Yield ``(line number, row)`` for each record of a CSV or JSONL file.
+
+    A row that cannot be parsed is yielded as the ``ValueError`` raised for it.
+    """
+    if os.path.splitext(path)[1].lower() == '.csv':
+        with open(path, newline='') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        return
+    with open(path) as f:
+        for line_num, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_num, e
+                continue
+            if not isinstance(row, dict):
+                row = ValueError('expected a JSON object')
+            yield line_num, row
+
+
+class RowValidator:
+    """Run rows through ``form`` and turn the valid ones into table records.
+
+    One form instance is reprocessed for every row. Calling the validator
+    with a list of ``(line, row)`` pairs returns ``(line, record, genres,
+    error)`` for each, with ``record`` None when the row was rejected.
+
+    The import forms validate each field on its own, so the outcome for a
+    field's value is kept and reused by the rows repeating it (the same
+    venue id, start time or genres), up to ``cache_size`` values. A form
+    with inline ``validate_<field>`` or ``filter_<field>`` methods, which
+    may read other fields, is processed whole for every row instead.
+    """
+
+    cache_size = 100000
+
+    def __init__(self, form, table):
+        self.form = form
+        self.fields = {name: field.type for name, field in form._fields.items()}
+        self.columns = [name for name in self.fields if name in table.c and name != 'id']
+        self.per_field = not any(
+            hasattr(type(form), f'{kind}_{name}') for name in self.fields for kind in ('validate', 'filter'))
+        self._results = {}
+
+    def to_formdata(self, row):
+        # The MultiDict a browser would have posted for ``row``: list values
+        # and comma separated genres become repeated keys, and boolean fields
+        # are only present when true.
+        formdata = MultiDict()
+        for name, value in row.items():
+            kind = self.fields.get(name)
+            if kind is None or value is None:
+                continue
+            if kind == 'BooleanField':
+                if str(value).strip().lower() not in FALSE_VALUES:
+                    formdata.add(name, 'y')
+            elif isinstance(value, list):
+                for item in value:
+                    formdata.add(name, str(item))
+            elif kind == 'SelectMultipleField':
+                for item in str(value).split(','):
+                    if item.strip():
+                        formdata.add(name, item.strip())
+            else:
+                formdata.add(name, str(value))
+        return formdata
+
+    def field_result(self, name, values):
+        # (data, errors) of field ``name`` submitted with ``values``.
+        key = (name, values)
+        result = self._results.get(key)
+        if result is None:
+            if len(self._results) >= self.cache_size:
+                self._results.clear()
+            field = self.form[name]
+            field.process(MultiDict([(name, value) for value in values]))
+            field.validate(self.form)
+            result = self._results[key] = (field.data, list(field.errors))
+        return result
+
+    def validate(self, formdata):
+        # The data and errors of each field of ``formdata``.
+        if self.per_field:
+            data = {}
+            errors = {}
+            for name in self.fields:
+                data[name], messages = self.field_result(name, tuple(formdata.getlist(name)))
+                if messages:
+                    errors[name] = messages
+            return data, errors
+        form = self.form
+        form.process(formdata)
+        form.validate()
+        return form.data, form.errors
+
+    def __call__(self, rows):
+        results = []
+        for line, row in rows:
+            if isinstance(row, Exception):
+                results.append((line, None, None, f'unreadable row: {row}'))
+                continue
+            data, errors = self.validate(self.to_formdata(row))
+            if errors:
+                results.append((line, None, None, '; '.join(
+                    f'{name}: {" ".join(messages)}' for name, messages in errors.items())))
+                continue
+            record = {name: data[name] for name in self.columns}
+            if 'id' in row:
+                record['id'] = row['id']
+            genres = data['genres'] if 'genres' in self.fields else None
+            results.append((line, record, genres, None))
+        return results
+
+
+# Validator of the current worker process, see BulkImporter.validated().
+_worker_validator = None
+
+
+def _start_worker(app, entity):
+    global _worker_validator
+    app.app_context().push()
+    _worker_validator = RowValidator(entity.form(meta={'csrf': False}), entity.table)
+
+
+def _validate_in_worker(rows):
+    return _worker_validator(rows)
+
+
+@contextmanager
+def deferred_indexes(engine, *tables):
+    """Drop the secondary indexes of ``tables`` and build them again on exit.
+
+    Building an index over a loaded table is several times faster than
+    updating it row by row, but reads using the indexes scan the whole table
+    in the meantime.
+    """
+    indexes = [index for table in tables for index in table.indexes]
+    for index in indexes:
+        index.drop(bind=engine)
+    try:
+        yield
+    finally:
+        for index in indexes:
+            index.create(bind=engine)
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Bookings:
+    """Start times of the shows of each venue and artist, to reject show rows
+    that double book either, as the show form does (see booking_conflicts()
+    in helpers.py): two shows overlap when they start less than ``duration``
+    apart. The shows already in ``tables`` are read on first use, and each
+    accepted row is added for the rows after it.
+    """
+
+    def __init__(self, engine, tables, duration):
+        self.engine = engine
+        self.tables = tables
+        self.duration = duration
+        self._starts = None
+
+    def starts(self, kind, ident):
+        # The sorted start times of the shows of a venue or an artist.
+        if self._starts is None:
+            self._starts = {}
+            with self.engine.connect() as connection:
+                for table in self.tables:
+                    rows = connection.execute(select(table.c.venue_id, table.c.artist_id, table.c.start_time))
+                    for venue_id, artist_id, start_time in rows:
+                        self._starts.setdefault(('venue', venue_id), []).append(start_time)
+                        self._starts.setdefault(('artist', artist_id), []).append(start_time)
+            for starts in self._starts.values():
+                starts.sort()
+        return self._starts.setdefault((kind, ident), [])
+
+    def book(self, record):
+        """Add the show ``record``, or return why it cannot be booked."""
+        start_time = record['start_time']
+        for kind in ('venue', 'artist'):
+            starts = self.starts(kind, record[f'{kind}_id'])
+            i = bisect_left(starts, start_time)
+            for other in starts[max(i - 1, 0):i + 1]:
+                if abs(other - start_time) < self.duration:
+                    return f'start_time: the {kind} already has a show at {other}'
+        for kind in ('venue', 'artist'):
+            insort(self.starts(kind, record[f'{kind}_id']), start_time)
+        return None
+
+    def cancel(self, record):
+        # Take back a booked show that could not be written.
+        for kind in ('venue', 'artist'):
+            self.starts(kind, record[f'{kind}_id']).remove(record['start_time'])
+
+
+class BulkImporter:
+    """Validate and insert rows in chunked transactions.
+
+    Rows are validated in chunks of ``batch_size``, in ``jobs`` forked worker
+    processes when more than one is asked for, while this process assigns
+    ids, checks references and writes. Each chunk is written with one
+    executemany per table (or COPY for shows on Postgres) in a single
+    transaction. If a chunk fails, its halves are retried, down to single
+    rows, so a bad row is reported on its own instead of aborting the load.
+    Venue and artist rows may carry an ``id`` for shows to refer to; rows
+    without one are numbered after the current maximum, so no other writer
+    should insert into the same table during an import.
+    """
+
+    def __init__(self, engine, genre_table, batch_size=50000, jobs=1):
+        self.engine = engine
+        self.genre_table = genre_table
+        self.batch_size = batch_size
+        self.jobs = jobs if 'fork' in multiprocessing.get_all_start_methods() else 1
+        self.errors = []
+        self.inserted = {}
+        self._ids = {}
+        self._next_id = {}
+        self._genre_ids = None
+
+    def error(self, path, line, message):
+        self.errors.append(RowError(path, line, message))
+
+    def known_ids(self, table):
+        if table.name not in self._ids:
+            with self.engine.connect() as connection:
+                self._ids[table.name] = set(connection.execute(select(table.c.id)).scalars())
+        return self._ids[table.name]
+
+    def allocate_id(self, table):
+        if table.name not in self._next_id:
+            self._next_id[table.name] = max(self.known_ids(table), default=0) + 1
+        while self._next_id[table.name] in self.known_ids(table):
+            self._next_id[table.name] += 1
+        return self._next_id[table.name]
+
+    def genre_ids(self, names):
+        # Ids of the genres called ``names``, creating the missing ones.
+        genre = self.genre_table
+        if self._genre_ids is None:
+            with self.engine.connect() as connection:
+                self._genre_ids = dict(connection.execute(select(genre.c.name, genre.c.id)).all())
+        missing = [name for name in dict.fromkeys(names) if name not in self._genre_ids]
+        if missing:
+            with self.engine.begin() as connection:
+                connection.execute(genre.insert(), [{'name': name} for name in missing])
+                self._genre_ids.update(connection.execute(
+                    select(genre.c.name, genre.c.id).where(genre.c.name.in_(missing))).all())
+        return [self._genre_ids[name] for name in dict.fromkeys(names)]
+
+    def validated(self, path, entity):
+        # Chunks of validated rows of ``path``, in file order.
+        chunks = chunked(read_rows(path), self.batch_size)
+        if self.jobs > 1:
+            context = multiprocessing.get_context('fork')
+            with context.Pool(self.jobs, _start_worker, (current_app._get_current_object(), entity)) as pool:
+                yield from pool.imap(_validate_in_worker, chunks)
+        else:
+            validator = RowValidator(entity.form(meta={'csrf': False}), entity.table)
+            for chunk in chunks:
+                yield validator(chunk)
+
+    def import_file(self, path, entity, references=(), bookings=None):
+        """Load ``path`` into ``entity``.
+
+        ``references`` pairs a column with the table its values must exist
+        in, e.g. a show's ``('venue_id', venue table)``. Show rows are
+        checked against ``bookings`` when given.
+        """
+        for results in self.validated(path, entity):
+            chunk = []
+            for line, record, genres, error in results:
+                if error is None:
+                    error = self.check_references(record, references)
+                if error is None and bookings is not None:
+                    error = bookings.book(record)
+                if error is None and entity.link_table is not None:
+                    error = self.assign_id(record, entity.table)
+                elif record is not None:
+                    record.pop('id', None)
+                if error is not None:
+                    self.error(path, line, error)
+                    continue
+                chunk.append((line, record, self.genre_ids(genres) if genres else []))
+            if chunk:
+                self.flush(path, entity, chunk, bookings)
+        self.reset_sequence(entity)
+
+    def load(self, entity, rows):
+        """Write trusted ``(record, genre names)`` pairs without validating them.
+
+        Meant for generated data; a failing chunk raises instead of being
+        retried row by row.
+        """
+        for chunk in chunked(rows, self.batch_size):
+            self.write(entity, [
+                (None, record, self.genre_ids(genres) if genres else []) for record, genres in chunk])
+            self.inserted[entity.name] = self.inserted.get(entity.name, 0) + len(chunk)
+        self.reset_sequence(entity)
+
+    def reset_sequence(self, entity):
+        if self.engine.dialect.name == 'postgresql' and entity.link_table is not None:
+            # Explicit ids bypass the sequence; move it past them.
+            with self.engine.begin() as connection:
+                connection.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{entity.table.name}', 'id'), "
+                    f"(SELECT coalesce(max(id), 0) + 1 FROM {entity.table.name}), false)")
+
+    def check_references(self, record, references):
+        for name, table in references:
+            try:
+                record[name] = int(record[name])
+            except (TypeError, ValueError):
+                return f'{name}: not an id'
+            if record[name] not in self.known_ids(table):
+                return f'{name}: no {table.name} with id {record[name]}'
+        return None
+
+    def assign_id(self, record, table):
+        if record.get('id') in (None, ''):
+            record['id'] = self.allocate_id(table)
+        else:
+            try:
+                record['id'] = int(record['id'])
+            except (TypeError, ValueError):
+                return 'id: not an id'
+            if record['id'] in self.known_ids(table):
+                return f'id: {table.name} {record["id"]} already exists'
+        self.known_ids(table).add(record['id'])
+        return None
+
+    def flush(self, path, entity, chunk, bookings=None):
+        written = self.write_or_split(path, entity, chunk, bookings)
+        self.inserted[entity.name] = self.inserted.get(entity.name, 0) + written
+
+    def write_or_split(self, path, entity, chunk, bookings):
+        # Write ``chunk``, or else each of its halves, down to the single
+        # rows that fail; returns the number of rows written.
+        # COPY reports failures as plain DBAPI errors.
+        errors = (SQLAlchemyError, self.engine.dialect.dbapi.Error)
+        try:
+            self.write(entity, chunk)
+            return len(chunk)
+        except errors as e:
+            if len(chunk) > 1:
+                middle = len(chunk) // 2
+                return (self.write_or_split(path, entity, chunk[:middle], bookings)
+                        + self.write_or_split(path, entity, chunk[middle:], bookings))
+            line, record, _ = chunk[0]
+            self.error(path, line, str(getattr(e, 'orig', e)).strip())
+            if 'id' in record:
+                self.known_ids(entity.table).discard(record['id'])
+            if bookings is not None:
+                bookings.cancel(record)
+            return 0
+
+    def write(self, entity, chunk):
+        with self.engine.begin() as connection:
+            records = [record for _, record, _ in chunk]
+            if entity.link_table is None and connection.dialect.name == 'postgresql':
+                copy_records(connection, entity.table, records)
+            else:
+                connection.execute(entity.table.insert(), records)
+            links = [
+                {'genre_id': genre_id, entity.link_key: record['id']}
+                for _, record, genre_ids in chunk
+                for genre_id in genre_ids
+            ]
+            if links:
+                connection.execute(entity.link_table.insert(), links)
+
+
+def copy_records(connection, table, records):
+    # Postgres COPY of plain (non-text) records through the DBAPI cursor.
+    columns = list(records[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow(['' if record[name] is None else record[name] for name in columns])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY {table.name} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+    finally:
+        cursor.close()
@@ -0,0 +1,146 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None or not has_app_context():
+        return
+    stats = g.get('request_metrics')
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """A Prometheus histogram with one series per label values tuple."""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series = defaultdict(lambda: [0] * (len(buckets) + 1) + [0.0])
+
+    def observe(self, values, amount):
+        series = self._series[values]
+        series[bisect_left(self.buckets, amount)] += 1
+        series[-1] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for values, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.labels, values, le=bound)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, values)} {series[-1]}')
+            lines.append(f'{self.name}_count{_labels(self.labels, values)} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series = defaultdict(int)
+
+    def inc(self, values):
+        self._series[values] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for values, count in sorted(self._series.items()):
+            lines.append(f'{self.name}{_labels(self.labels, values)} {count}')
+        return lines
+
+
+class Metrics:
+    """Per-request SQL and latency instrumentation.
+
+    Engine events count the statements each request runs and the time spent
+    in them. Every response gets a ``Server-Timing`` header with the DB and
+    total time, and the numbers are aggregated per endpoint into histograms
+    that ``render()`` formats for Prometheus. Each process keeps its own
+    numbers; Prometheus sums them across the scraped workers.
+
+    Disabled with ``METRICS_ENABLED = False``.
+    """
+
+    def __init__(self, app=None):
+        self.duration = Histogram(
+            'fyyur_request_duration_seconds', 'Time to build the response.',
+            ('endpoint', 'method'), DURATION_BUCKETS)
+        self.db_time = Histogram(
+            'fyyur_request_db_seconds', 'Time spent in SQL statements per request.',
+            ('endpoint', 'method'), DURATION_BUCKETS)
+        self.queries = Histogram(
+            'fyyur_request_queries', 'SQL statements run per request.',
+            ('endpoint', 'method'), QUERY_BUCKETS)
+        self.responses = Counter(
+            'fyyur_responses_total', 'Responses sent by status code.', ('endpoint', 'status'))
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.extensions['metrics'] = self
+
+    def _start_request(self):
+        g.request_started = time.perf_counter()
+        g.request_metrics = [0, 0.0]
+
+    def _finish_request(self, response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        count, db_time = g.request_metrics
+        response.headers.add(
+            'Server-Timing', f'db;dur={db_time * 1000:.1f};desc="{count} queries", app;dur={elapsed * 1000:.1f}')
+        labels = (request.endpoint or 'none', request.method)
+        with self._lock:
+            self.duration.observe(labels, elapsed)
+            self.db_time.observe(labels, db_time)
+            self.queries.observe(labels, count)
+            self.responses.inc((labels[0], response.status_code))
+        return response
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in (self.duration, self.db_time, self.queries, self.responses):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
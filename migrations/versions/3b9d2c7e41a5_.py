@@ -0,0 +1,63 @@
+"""add trigram name search indexes
+
+Revision ID: 3b9d2c7e41a5
+Revises: e629a268fd38
+Create Date: 2022-06-04 11:20:41.118203
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d2c7e41a5'
+down_revision = 'e629a268fd38'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venue', 'artist')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table in TABLES:
+            op.create_index(
+                f'ix_{table}_name_trgm', table, ['name'],
+                postgresql_using='gin',
+                postgresql_ops={'name': 'gin_trgm_ops'}
+            )
+    elif dialect == 'sqlite':
+        for table in TABLES:
+            op.execute(
+                f"CREATE VIRTUAL TABLE {table}_fts USING fts5("
+                f"name, content='{table}', content_rowid='id', tokenize='trigram')"
+            )
+            op.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+            op.execute(
+                f"CREATE TRIGGER {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {table}_fts(rowid, name) VALUES (new.id, new.name); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {table}_fts({table}_fts, rowid, name) "
+                f"VALUES ('delete', old.id, old.name); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER {table}_fts_au AFTER UPDATE OF name ON {table} BEGIN "
+                f"INSERT INTO {table}_fts({table}_fts, rowid, name) "
+                f"VALUES ('delete', old.id, old.name); "
+                f"INSERT INTO {table}_fts(rowid, name) VALUES (new.id, new.name); END"
+            )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for table in TABLES:
+            op.drop_index(f'ix_{table}_name_trgm', table_name=table)
+    elif dialect == 'sqlite':
+        for table in TABLES:
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
@@ -0,0 +1,36 @@
+"""add updated_at page version stamps
+
+Revision ID: 6f3b1e9a2c47
+Revises: d41a7f3c9e25
+Create Date: 2022-06-16 10:12:48.215093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f3b1e9a2c47'
+down_revision = 'd41a7f3c9e25'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('venue', 'artist')
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite cannot add a column with a non-constant default, so existing
+        # rows get a constant one and are then stamped with the current time.
+        for table in TABLES:
+            op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default='1970-01-01 00:00:00', nullable=False))
+            op.execute(f'UPDATE {table} SET updated_at = CURRENT_TIMESTAMP')
+    else:
+        for table in TABLES:
+            op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,87 @@
+"""normalize genres into association tables
+
+Revision ID: b7e2d94f0c61
+Revises: 9c4a6d2e8f13
+Create Date: 2022-06-11 14:31:02.781446
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d94f0c61'
+down_revision = '9c4a6d2e8f13'
+branch_labels = None
+depends_on = None
+
+# (entity table, association table, association foreign key)
+GENRE_TABLES = (
+    ('venue', 'venue_genre', 'venue_id'),
+    ('artist', 'artiste_genre', 'artist_id'),
+)
+
+
+def upgrade():
+    genre = op.create_table('genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    for table, secondary, key in GENRE_TABLES:
+        op.create_table(secondary,
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.Column(key, sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['genre_id'], ['genre.id'], ),
+        sa.ForeignKeyConstraint([key], [f'{table}.id'], ),
+        sa.PrimaryKeyConstraint('genre_id', key)
+        )
+        op.create_index(f'ix_{secondary}_{key}', secondary, [key], unique=False)
+
+    # Backfill from the comma separated genres columns.
+    connection = op.get_bind()
+    links = {}
+    for table, secondary, key in GENRE_TABLES:
+        rows = connection.execute(sa.text(f'SELECT id, genres FROM {table}'))
+        links[table] = [
+            (row.id, name.strip())
+            for row in rows
+            for name in (row.genres or '').split(',')
+            if name.strip()
+        ]
+    names = sorted({name for pairs in links.values() for _, name in pairs})
+    if names:
+        op.bulk_insert(genre, [{'name': name} for name in names])
+    genre_ids = dict(
+        (row.name, row.id) for row in connection.execute(sa.text('SELECT id, name FROM genre'))
+    )
+    for table, secondary, key in GENRE_TABLES:
+        pairs = {(genre_ids[name], entity_id) for entity_id, name in links[table]}
+        if pairs:
+            connection.execute(
+                sa.text(f'INSERT INTO {secondary} (genre_id, {key}) VALUES (:genre_id, :entity_id)'),
+                [{'genre_id': genre_id, 'entity_id': entity_id} for genre_id, entity_id in sorted(pairs)]
+            )
+        op.drop_column(table, 'genres')
+
+
+def downgrade():
+    connection = op.get_bind()
+    for table, secondary, key in GENRE_TABLES:
+        op.add_column(table, sa.Column('genres', sa.String(length=120), nullable=True))
+        rows = connection.execute(sa.text(
+            f'SELECT {secondary}.{key} AS entity_id, genre.name FROM {secondary} '
+            f'JOIN genre ON genre.id = {secondary}.genre_id ORDER BY genre.name'
+        ))
+        genres = {}
+        for row in rows:
+            genres.setdefault(row.entity_id, []).append(row.name)
+        if genres:
+            connection.execute(
+                sa.text(f'UPDATE {table} SET genres = :genres WHERE id = :entity_id'),
+                [{'genres': ','.join(names), 'entity_id': entity_id} for entity_id, names in genres.items()]
+            )
+        op.drop_index(f'ix_{secondary}_{key}', table_name=secondary)
+        op.drop_table(secondary)
+    op.drop_table('genre')
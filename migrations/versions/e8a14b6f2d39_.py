@@ -0,0 +1,55 @@
+"""never reuse show ids on SQLite
+
+Revision ID: e8a14b6f2d39
+Revises: c5d92e4f1a08
+Create Date: 2022-06-21 16:03:44.870215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a14b6f2d39'
+down_revision = 'c5d92e4f1a08'
+branch_labels = None
+depends_on = None
+
+
+def show_table():
+    # show as created by the earlier revisions, for SQLite's copy-and-rename
+    # table rebuild.
+    return sa.Table(
+        'show', sa.MetaData(),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('venue_id', sa.Integer(), sa.ForeignKey('venue.id'), nullable=False),
+        sa.Column('artist_id', sa.Integer(), sa.ForeignKey('artist.id'), nullable=False),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        sa.Index('ix_show_start_time_id', 'start_time', 'id'),
+        sa.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+    )
+
+
+def upgrade():
+    # Postgres takes show ids from a sequence, which never goes back. SQLite
+    # hands out max(id) + 1 unless the table has AUTOINCREMENT, and would
+    # reuse the ids of archived shows still present in show_listing.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('show', copy_from=show_table(), recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}):
+        pass
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'show'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'show', coalesce(max(id), 0) FROM "
+        '(SELECT id FROM show UNION ALL SELECT id FROM show_archive UNION ALL SELECT id FROM show_listing)'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('show', copy_from=show_table(), recreate='always'):
+        pass
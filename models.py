@@ -0,0 +1,507 @@
+from datetime import datetime
+
+from sqlalchemy import DDL, bindparam, case, delete, event, func, insert, inspect, select, union, update
+
+from extensions import db
+
+# ----------------------------------------------------------------------------#
+# Models.
+# ----------------------------------------------------------------------------#
+
+venue_genre = db.Table(
+    'venue_genre',
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True),
+    db.Column('venue_id', db.Integer, db.ForeignKey('venue.id'), primary_key=True),
+    db.Index('ix_venue_genre_venue_id', 'venue_id')
+)
+
+artiste_genre = db.Table(
+    'artiste_genre',
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True),
+    db.Column('artist_id', db.Integer, db.ForeignKey('artist.id'), primary_key=True),
+    db.Index('ix_artiste_genre_artist_id', 'artist_id')
+)
+
+
+class Genre(db.Model):
+    __tablename__ = 'genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f'<Genre {self.id} {self.name}>'
+
+
+class Venue(db.Model):
+    __tablename__ = 'venue'
+    __table_args__ = (
+        # Keyset ordering of the /venues area listing.
+        db.Index('ix_venue_state_city_name_id', 'state', 'city', 'name', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String())
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    address = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    genres = db.relationship('Genre', secondary=venue_genre, lazy='selectin',
+                             backref=db.backref('venues', lazy=True))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    website_link = db.Column(db.String(120))
+    seeking_talent = db.Column(
+      db.Boolean, nullable=False, default=False)
+    seeking_description = db.Column(db.Text)
+    # Maintained incrementally, see "Show counters" below.
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Changes whenever the detail page does, see "Page versions" below.
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, server_default=func.now())
+    shows = db.relationship('Show', backref='venue', lazy=True)
+
+    def __repr__(self):
+        return f'<Venue {self.id} {self.name}>'
+
+
+class Artist(db.Model):
+    __tablename__ = 'artist'
+    __table_args__ = (
+        # Keyset ordering of the /artists listing.
+        db.Index('ix_artist_name_id', 'name', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String())
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    genres = db.relationship('Genre', secondary=artiste_genre, lazy='selectin',
+                             backref=db.backref('artists', lazy=True))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    website_link = db.Column(db.String(120))
+    seeking_venue = db.Column(
+        db.Boolean, nullable=False, default=False)
+    seeking_description = db.Column(db.Text)
+    # Maintained incrementally, see "Show counters" below.
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Changes whenever the detail page does, see "Page versions" below.
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, server_default=func.now())
+    shows = db.relationship('Show', backref='artist', lazy=True)
+
+    def __repr__(self):
+        return f'<Artist {self.id} {self.name}>'
+
+
+class Show(db.Model):
+    __tablename__ = 'show'
+    __table_args__ = (
+        # Detail pages read a venue's or artist's shows by start time; the
+        # /shows listing pages through all of them by (start_time, id).
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_show_start_time_id', 'start_time', 'id'),
+        # Ids of archived shows live on in show_archive and show_listing, so
+        # SQLite must not hand them out again.
+        {'sqlite_autoincrement': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(
+        db.Integer,
+        db.ForeignKey('venue.id'),
+        nullable=False
+    )
+    artist_id = db.Column(
+        db.Integer,
+        db.ForeignKey('artist.id'),
+        nullable=False
+    )
+    start_time = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<Show {self.id} venue: {self.venue_id} artist: {self.artist_id}>'
+
+
+class ShowRollover(db.Model):
+    __tablename__ = 'show_rollover'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Shows starting before this time are counted as past in the show
+    # counters, the rest as upcoming.
+    rolled_until = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<ShowRollover {self.rolled_until}>'
+
+
+class ShowArchive(db.Model):
+    # Shows moved out of ``show`` by archive_shows(), see "Show archive"
+    # below. Same columns, and the same per venue and per artist indexes
+    # for the past shows of the detail pages.
+    __tablename__ = 'show_archive'
+    __table_args__ = (
+        db.Index('ix_show_archive_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_archive_artist_id_start_time', 'artist_id', 'start_time'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<ShowArchive {self.id} venue: {self.venue_id} artist: {self.artist_id}>'
+
+
+class ShowListing(db.Model):
+    # One row per show, archived or not, with what a show tile renders, so
+    # /shows reads a range of one table. Kept in sync by the functions under
+    # "Show listing" below.
+    __tablename__ = 'show_listing'
+    __table_args__ = (
+        db.Index('ix_show_listing_start_time_id', 'start_time', 'id'),
+        db.Index('ix_show_listing_venue_id', 'venue_id'),
+        db.Index('ix_show_listing_artist_id', 'artist_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    start_time = db.Column(db.DateTime, nullable=False)
+    venue_id = db.Column(db.Integer, nullable=False)
+    venue_name = db.Column(db.String)
+    venue_image_link = db.Column(db.String(500))
+    artist_id = db.Column(db.Integer, nullable=False)
+    artist_name = db.Column(db.String)
+    artist_image_link = db.Column(db.String(500))
+
+    def __repr__(self):
+        return f'<ShowListing {self.id} {self.start_time}>'
+
+
+# ----------------------------------------------------------------------------#
+# Search indexes.
+# ----------------------------------------------------------------------------#
+
+# Name search is a case-insensitive substring match. Postgres serves it from a
+# pg_trgm GIN index; SQLite from an external-content FTS5 table using the
+# trigram tokenizer, kept in sync by triggers. The same objects are created by
+# the migrations; these hooks cover databases built with db.create_all().
+
+
+def search_index_ddl(tablename):
+    return {
+        'postgresql': [
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+            f'CREATE INDEX IF NOT EXISTS ix_{tablename}_name_trgm '
+            f'ON {tablename} USING gin (name gin_trgm_ops)',
+        ],
+        'sqlite': [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {tablename}_fts USING fts5("
+            f"name, content='{tablename}', content_rowid='id', tokenize='trigram')",
+            f"INSERT INTO {tablename}_fts({tablename}_fts) VALUES ('rebuild')",
+            f"CREATE TRIGGER IF NOT EXISTS {tablename}_fts_ai AFTER INSERT ON {tablename} BEGIN "
+            f"INSERT INTO {tablename}_fts(rowid, name) VALUES (new.id, new.name); END",
+            f"CREATE TRIGGER IF NOT EXISTS {tablename}_fts_ad AFTER DELETE ON {tablename} BEGIN "
+            f"INSERT INTO {tablename}_fts({tablename}_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+            f"CREATE TRIGGER IF NOT EXISTS {tablename}_fts_au AFTER UPDATE OF name ON {tablename} BEGIN "
+            f"INSERT INTO {tablename}_fts({tablename}_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+            f"INSERT INTO {tablename}_fts(rowid, name) VALUES (new.id, new.name); END",
+        ],
+    }
+
+
+for _model in (Venue, Artist):
+    for _dialect, _statements in search_index_ddl(_model.__tablename__).items():
+        for _statement in _statements:
+            event.listen(
+                _model.__table__, 'after_create',
+                DDL(_statement).execute_if(dialect=_dialect)
+            )
+
+
+# ----------------------------------------------------------------------------#
+# Show counters.
+# ----------------------------------------------------------------------------#
+
+# Venue and Artist carry past_shows_count/upcoming_shows_count so listings and
+# search can show them without touching the show table. A show is counted as
+# upcoming while its start time is at or after the single ShowRollover row's
+# rolled_until; rollover_show_counters() advances that mark and moves the
+# shows it passes from upcoming to past. Archived shows count as past.
+
+SHOW_COUNTERS = (
+    (Venue, Show.venue_id),
+    (Artist, Show.artist_id),
+)
+
+
+def show_rollover(for_update=False):
+    # The rollover mark, created with freshly recounted counters if missing.
+    # Show writes take it shared and the rollover exclusively, so a show is
+    # never counted against a mark that moves before it commits.
+    query = ShowRollover.query.filter_by(id=1)
+    if for_update:
+        query = query.with_for_update()
+    else:
+        query = query.with_for_update(read=True)
+    state = query.first()
+    if state is None:
+        state = refresh_show_counters()
+    return state
+
+
+def counter_column(start_time, rolled_until):
+    return 'upcoming_shows_count' if start_time >= rolled_until else 'past_shows_count'
+
+
+def count_show(show, delta=1):
+    # Add ``delta`` to the counters of the show's venue and artist, and bump
+    # their page versions; returns the models of those that do not exist.
+    column = counter_column(show.start_time, show_rollover().rolled_until)
+    now = datetime.utcnow()
+    missing = []
+    for model, key in SHOW_COUNTERS:
+        if not model.query.filter(model.id == getattr(show, key.key)).update(
+                {column: getattr(model, column) + delta, 'updated_at': now}, synchronize_session=False):
+            missing.append(model)
+    return missing
+
+
+def uncount_venue_shows(venue_id):
+    # Take a venue's shows off its artists' counters before they are deleted;
+    # returns the ids of those artists.
+    rolled_until = show_rollover().rolled_until
+    rows = db.session.query(
+        Show.artist_id,
+        func.sum(case((Show.start_time >= rolled_until, 1), else_=0)).label('upcoming'),
+        func.sum(case((Show.start_time < rolled_until, 1), else_=0)).label('past')
+    ).filter(Show.venue_id == venue_id).group_by(Show.artist_id).all()
+    counts = {row.artist_id: [row.upcoming, row.past] for row in rows}
+    archived = db.session.query(ShowArchive.artist_id, func.count()).filter(
+        ShowArchive.venue_id == venue_id).group_by(ShowArchive.artist_id)
+    for artist_id, past in archived:
+        counts.setdefault(artist_id, [0, 0])[1] += past
+    if counts:
+        db.session.execute(
+            update(Artist).where(Artist.id == bindparam('artist_id')).values(
+                upcoming_shows_count=Artist.upcoming_shows_count - bindparam('upcoming'),
+                past_shows_count=Artist.past_shows_count - bindparam('past'),
+                updated_at=datetime.utcnow()),
+            [{'artist_id': artist_id, 'upcoming': upcoming, 'past': past}
+             for artist_id, (upcoming, past) in counts.items()]
+        )
+    return list(counts)
+
+
+def rollover_show_counters(now=None):
+    """Move shows that started since the last rollover from upcoming to past.
+
+    Only the shows in ``[rolled_until, now)`` are read, through the
+    ``start_time`` index. Returns the number of shows moved.
+    """
+    now = now or datetime.now()
+    state = show_rollover(for_update=True)
+    if now <= state.rolled_until:
+        db.session.commit()
+        return 0
+    moved = 0
+    for model, key in SHOW_COUNTERS:
+        rows = db.session.query(key, func.count().label('moved')).filter(
+            Show.start_time >= state.rolled_until, Show.start_time < now
+        ).group_by(key).all()
+        if rows:
+            db.session.execute(
+                update(model).where(model.id == bindparam('entity_id')).values(
+                    upcoming_shows_count=model.upcoming_shows_count - bindparam('moved'),
+                    past_shows_count=model.past_shows_count + bindparam('moved')),
+                [{'entity_id': row[0], 'moved': row.moved} for row in rows]
+            )
+            moved = sum(row.moved for row in rows)
+    state.rolled_until = now
+    db.session.commit()
+    return moved
+
+
+def refresh_show_counters(now=None):
+    # Recount every venue's and artist's shows from scratch and reset the
+    # rollover mark to ``now``. Used after bulk loads and for repairs.
+    now = now or datetime.now()
+    for model, key in SHOW_COUNTERS:
+        shows = select(func.count()).where(key == model.id).scalar_subquery()
+        archived = select(func.count()).where(getattr(ShowArchive, key.key) == model.id).scalar_subquery()
+        db.session.execute(update(model).values(
+            upcoming_shows_count=shows.where(Show.start_time >= now),
+            past_shows_count=shows.where(Show.start_time < now) + archived
+        ))
+    state = ShowRollover.query.get(1)
+    if state is None:
+        state = ShowRollover(id=1, rolled_until=now)
+        db.session.add(state)
+    state.rolled_until = now
+    db.session.flush()
+    return state
+
+
+# ----------------------------------------------------------------------------#
+# Page versions.
+# ----------------------------------------------------------------------------#
+
+# Venue.updated_at and Artist.updated_at are bumped, in the transaction of the
+# write, whenever their detail page changes: on an edit of the venue or artist,
+# on a change to its shows (count_show() and uncount_venue_shows() stamp the
+# rows whose counters they update), and on an edit of a venue or artist on
+# the other side of one of its shows, whose name and image the page shows.
+# They are not onupdate columns, so counter rollovers leave them alone. Pages
+# also change when an upcoming show starts; see page_version_query().
+
+
+def touch_venue(venue, now=None):
+    # The venue's page, flushed with the edit, and when the edit changes the
+    # venue's name or image, the pages of the artists playing there. Call
+    # before the edit is flushed.
+    now = now or datetime.utcnow()
+    venue.updated_at = now
+    if listing_changed(venue):
+        Artist.query.filter(Artist.id.in_(show_partners('venue_id', venue.id))).update(
+            {'updated_at': now}, synchronize_session=False)
+
+
+def touch_artist(artist, now=None):
+    # The artist's page, flushed with the edit, and when the edit changes the
+    # artist's name or image, the pages of the venues it plays. Call before
+    # the edit is flushed.
+    now = now or datetime.utcnow()
+    artist.updated_at = now
+    if listing_changed(artist):
+        Venue.query.filter(Venue.id.in_(show_partners('artist_id', artist.id))).update(
+            {'updated_at': now}, synchronize_session=False)
+
+
+def touch_all(now=None):
+    # After bulk writes that may reach any page.
+    now = now or datetime.utcnow()
+    for model in (Venue, Artist):
+        model.query.update({'updated_at': now}, synchronize_session=False)
+
+
+# ----------------------------------------------------------------------------#
+# Show listing.
+# ----------------------------------------------------------------------------#
+
+# show_listing copies each show's start time and its venue's and artist's
+# names and image links. Rows are added with the show, removed with it, and
+# rewritten when a venue or artist edit changes a copied column.
+
+LISTED_COLUMNS = {
+    Venue: ('name', 'image_link'),
+    Artist: ('name', 'image_link'),
+}
+
+
+def show_listing_select(model=Show):
+    # The show_listing rows of the shows in ``model``'s table (Show or
+    # ShowArchive), as the source of INSERT ... SELECT.
+    return select(
+        model.id, model.start_time,
+        model.venue_id, Venue.name, Venue.image_link,
+        model.artist_id, Artist.name, Artist.image_link
+    ).join(Venue, Venue.id == model.venue_id).join(Artist, Artist.id == model.artist_id)
+
+
+def list_show(show):
+    # Add the listing row of a new show, flushing it first.
+    db.session.flush()
+    db.session.execute(insert(ShowListing).from_select(
+        [column.key for column in ShowListing.__table__.columns],
+        show_listing_select().where(Show.id == show.id)))
+
+
+def list_shows_after(show_id):
+    # Add the listing rows of the shows numbered after ``show_id``, e.g. the
+    # ones a bulk load has just added.
+    db.session.execute(insert(ShowListing).from_select(
+        [column.key for column in ShowListing.__table__.columns],
+        show_listing_select().where(Show.id > show_id)))
+
+
+def listing_changed(entity):
+    # Whether the unflushed edit of a venue or artist changes what the show
+    # listings, and the other side's pages, show of it.
+    state = inspect(entity)
+    return any(state.attrs[name].history.has_changes() for name in LISTED_COLUMNS[type(entity)])
+
+
+def relist(entity):
+    # Rewrite the listing rows of a venue or artist being edited, when the
+    # edit changes their name or image. Call before the edit is flushed; the
+    # edit stays unflushed for touch_venue()/touch_artist() to check too.
+    if not listing_changed(entity):
+        return
+    model = type(entity)
+    prefix = model.__tablename__
+    with db.session.no_autoflush:
+        db.session.execute(update(ShowListing).where(
+            getattr(ShowListing, f'{prefix}_id') == entity.id
+        ).values({f'{prefix}_{name}': getattr(entity, name) for name in LISTED_COLUMNS[model]}))
+
+
+def unlist_venue_shows(venue_id):
+    db.session.execute(delete(ShowListing).where(ShowListing.venue_id == venue_id))
+
+
+def refresh_show_listing():
+    # Rebuild show_listing from scratch. Used after bulk loads and for repairs.
+    db.session.execute(delete(ShowListing))
+    for model in SHOW_TABLES:
+        db.session.execute(insert(ShowListing).from_select(
+            [column.key for column in ShowListing.__table__.columns], show_listing_select(model)))
+
+
+# ----------------------------------------------------------------------------#
+# Show archive.
+# ----------------------------------------------------------------------------#
+
+# archive_shows() moves shows that started long ago (SHOW_ARCHIVE_AFTER_DAYS,
+# run by `flask fyyur archive-shows`) from show to show_archive, so the reads
+# of upcoming shows, the rollover and the double booking checks only see
+# recent and upcoming shows. Archived shows keep their id, their listing row
+# and their place in the past-show counters; the detail pages read them back
+# with their past shows.
+
+SHOW_TABLES = (Show, ShowArchive)
+
+
+def show_partners(key, ident):
+    # The ids on the other side of the shows, archived or not, whose ``key``
+    # ('venue_id' or 'artist_id') is ``ident``.
+    other = 'artist_id' if key == 'venue_id' else 'venue_id'
+    return union(*[
+        select(getattr(model, other)).where(getattr(model, key) == ident) for model in SHOW_TABLES])
+
+
+def archive_shows(before, batch_size=10000):
+    """Move the shows starting before ``before`` to show_archive.
+
+    Shows are moved oldest first, ``batch_size`` per transaction, and never
+    past the rollover mark, so only shows counted as past are moved.
+    Returns the number of shows moved.
+    """
+    moved = 0
+    while True:
+        before = min(before, show_rollover().rolled_until)
+        ids = [show_id for (show_id,) in db.session.query(Show.id).filter(
+            Show.start_time < before
+        ).order_by(Show.start_time, Show.id).limit(batch_size)]
+        if not ids:
+            db.session.commit()
+            return moved
+        columns = [column.key for column in ShowArchive.__table__.columns]
+        db.session.execute(insert(ShowArchive).from_select(
+            columns, select(*[getattr(Show, column) for column in columns]).where(Show.id.in_(ids))))
+        db.session.execute(delete(Show).where(Show.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
+
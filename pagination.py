@@ -0,0 +1,95 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+# A page of a keyset-paginated listing. The cursors are opaque strings to be
+# passed back as ``after``/``before``; either is None at the end of the listing.
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor', 'per_page'])
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(values):
+    data = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    # Returns the key values stored in ``cursor``, or None when it is missing
+    # or malformed so a bad link falls back to the first page.
+    if not cursor:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = [_decode_value(value) for value in json.loads(data)]
+    except (ValueError, TypeError, KeyError):
+        return None
+    if len(values) != length:
+        return None
+    return values
+
+
+def row_cursor(row, keys):
+    return encode_cursor([getattr(row, key.key) for key in keys])
+
+
+def keyset_query(query, keys, per_page, after=None, before=None):
+    """Return ``(query, page)`` for one page of ``query`` ordered by ``keys``.
+
+    ``query`` (a Query or a select()) is limited to the rows of the page;
+    ``page(rows)`` turns the rows it returns into the ``Page``. Views that
+    execute the statement themselves, e.g. asynchronously, use this instead
+    of ``keyset_page``.
+    """
+    after_values = decode_cursor(after, len(keys))
+    before_values = decode_cursor(before, len(keys))
+
+    if before_values is not None:
+        query = query.filter(tuple_(*keys) < tuple_(*before_values)).order_by(
+            *[key.desc() for key in keys]).limit(per_page + 1)
+
+        def page(rows):
+            has_more = len(rows) > per_page
+            items = rows[:per_page][::-1]
+            next_cursor = row_cursor(items[-1], keys) if items else before
+            prev_cursor = row_cursor(items[0], keys) if has_more else None
+            return Page(items, next_cursor, prev_cursor, per_page)
+        return query, page
+
+    if after_values is not None:
+        query = query.filter(tuple_(*keys) > tuple_(*after_values))
+    query = query.order_by(*keys).limit(per_page + 1)
+
+    def page(rows):
+        items = rows[:per_page]
+        next_cursor = row_cursor(items[-1], keys) if len(rows) > per_page else None
+        prev_cursor = None
+        if after_values is not None:
+            prev_cursor = row_cursor(items[0], keys) if items else after
+        return Page(items, next_cursor, prev_cursor, per_page)
+    return query, page
+
+
+def keyset_page(query, keys, per_page, after=None, before=None):
+    """Return one ``Page`` of ``query`` ordered by ``keys``.
+
+    ``keys`` must be a unique, indexed ordering (e.g. ``(Artist.name, Artist.id)``)
+    and each row must expose them as attributes. Pages are addressed by the key
+    values of their boundary rows rather than by an OFFSET, so every page costs
+    one index range scan of ``per_page + 1`` rows.
+    """
+    query, page = keyset_query(query, keys, per_page, after=after, before=before)
+    return page(query.all())
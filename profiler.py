@@ -0,0 +1,90 @@
+import cProfile
+import hmac
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+
+from flask import g, request
+
+
+class RequestProfiler:
+    """Run single requests under cProfile on demand.
+
+    With ``PROFILER_ENABLED`` set, a request with ``?__profile=1`` and the
+    ``PROFILER_TOKEN`` (in an ``X-Profile-Token`` header or a
+    ``__profile_token`` query argument) is profiled from the start of the
+    view to the end of the response, including template rendering. The
+    stats are dumped to ``PROFILER_DIR`` as a ``.prof`` file, readable with
+    pstats, snakeviz or flameprof, next to a ``.json`` file giving the
+    route, status, duration and query count. The response's ``X-Profile``
+    header names the files.
+
+    Profiled requests bypass the page cache. The query count comes from
+    the metrics extension and is null when it is disabled.
+    """
+
+    def __init__(self, app=None):
+        self.token = None
+        self.directory = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('PROFILER_ENABLED'):
+            return
+        self.token = app.config.get('PROFILER_TOKEN')
+        if not self.token:
+            raise ValueError('PROFILER_ENABLED needs a PROFILER_TOKEN')
+        self.directory = app.config['PROFILER_DIR']
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.extensions['profiler'] = self
+
+    def _authorized(self):
+        if request.args.get('__profile') != '1':
+            return False
+        token = request.headers.get('X-Profile-Token') or request.args.get('__profile_token', '')
+        return hmac.compare_digest(token.encode(), self.token.encode())
+
+    def _start(self):
+        if not self._authorized():
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already running in this thread.
+            return
+        g.profile = profile
+        g.profile_started = time.perf_counter()
+        g.cache_bypass = True
+
+    def _finish(self, response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        profile.disable()
+        duration = time.perf_counter() - g.profile_started
+        endpoint = request.endpoint or 'none'
+        name = '{}-{}-{}'.format(
+            datetime.utcnow().strftime('%Y%m%dT%H%M%S'),
+            re.sub(r'[^\w.-]', '_', endpoint), uuid.uuid4().hex[:8])
+        profile.dump_stats(os.path.join(self.directory, f'{name}.prof'))
+        stats = g.get('request_metrics')
+        with open(os.path.join(self.directory, f'{name}.json'), 'w') as f:
+            json.dump({
+                'endpoint': endpoint,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 3),
+                'queries': stats[0] if stats else None,
+                'db_ms': round(stats[1] * 1000, 3) if stats else None,
+                'at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            }, f, indent=2)
+        response.headers['X-Profile'] = name
+        return response
@@ -0,0 +1,60 @@
+import time
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, get_state
+from sqlalchemy import event, orm
+
+REPLICA = 'replica'
+
+
+def reads_from_replica(app):
+    # Reads of a GET request go to the replica unless this browser made a
+    # write within REPLICA_READ_YOUR_WRITES_SECONDS (e.g. the redirect after
+    # a submission), or the view asked for the primary with g.read_primary.
+    return (
+        has_request_context()
+        and request.method in ('GET', 'HEAD')
+        and REPLICA in app.config['SQLALCHEMY_BINDS']
+        and not g.get('read_primary')
+        and session.get('primary_until', 0) < time.time()
+    )
+
+
+class RoutingSession(SignallingSession):
+    """Session sending the queries of read-only requests to the replica.
+
+    Flushes, and everything in POST/DELETE requests, use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and reads_from_replica(self.app):
+            return get_state(self.app).db.get_engine(self.app, bind=REPLICA)
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """SQLAlchemy with an optional read replica bound as ``replica``."""
+
+    def create_session(self, options):
+        factory = orm.sessionmaker(class_=RoutingSession, db=self, **options)
+        event.listen(factory, 'after_flush', self._record_write)
+        return factory
+
+    def init_app(self, app):
+        app.config.setdefault('SQLALCHEMY_BINDS', {})
+        super().init_app(app)
+        app.after_request(self._remember_writes)
+
+    @staticmethod
+    def _record_write(db_session, flush_context):
+        if has_request_context():
+            g.db_wrote = True
+
+    @staticmethod
+    def _remember_writes(response):
+        # Pin this browser's reads to the primary until the replica has
+        # caught up with its write.
+        config = current_app.config
+        if g.get('db_wrote') and REPLICA in config['SQLALCHEMY_BINDS']:
+            session['primary_until'] = time.time() + config.get('REPLICA_READ_YOUR_WRITES_SECONDS', 10)
+        return response
@@ -0,0 +1,190 @@
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from forms import genre_choices, state_choices
+
+CITY_PREFIXES = [
+    'Spring', 'Green', 'Lake', 'River', 'Oak', 'Maple', 'Fair', 'Clear', 'Mill',
+    'Stone', 'Red', 'North', 'East', 'West', 'South', 'New', 'Cedar', 'Pine',
+]
+CITY_SUFFIXES = [
+    'field', 'ville', 'ton', ' Falls', ' Heights', 'port', 'wood', 'dale', 'burg', ' City',
+]
+VENUE_WORDS = [
+    'Blue', 'Velvet', 'Golden', 'Rusty', 'Silver', 'Electric', 'Midnight', 'Crimson',
+    'Lucky', 'Hidden', 'Broken', 'Wild', 'Dueling', 'Musical', 'Copper', 'Neon',
+]
+VENUE_KINDS = [
+    'Hall', 'Room', 'Lounge', 'Bar', 'Club', 'Theatre', 'Tavern', 'Arena', 'Cellar',
+    'Garden', 'Ballroom', 'Hop', 'Pianos Bar', 'Saloon',
+]
+STREETS = ['Main', 'Market', 'Folsom', 'Delancey', 'Broadway', 'Church', 'High', 'Park', 'Elm']
+ARTIST_WORDS = [
+    'Guns', 'Petals', 'Matt', 'Quevedo', 'Wild', 'Sax', 'Band', 'Echo', 'Velvet',
+    'Paper', 'Tigers', 'Ghost', 'Harbor', 'Lights', 'Static', 'Honey', 'Wolves', 'Moon',
+]
+ARTIST_FORMS = ['{} {}', 'The {} {}', '{} & the {}', '{} {} Trio', 'DJ {}{}']
+
+
+def show_slots(duration):
+    # Show start times of a day from 18:00 until midnight, ``duration``
+    # minutes apart, so shows in different slots never overlap.
+    return [timedelta(minutes=minutes) for minutes in range(18 * 60, 24 * 60, max(duration, 1))]
+
+
+def zipf_cum_weights(n, s=1.1):
+    # Cumulative weights giving rank k a share proportional to 1 / k**s, the
+    # usual long tail of a few busy venues and popular artists.
+    return list(accumulate(1 / (k ** s) for k in range(1, n + 1)))
+
+
+class Catalog:
+    """A deterministic synthetic catalog of venues, artists and shows.
+
+    The same ``seed`` and sizes always produce the same rows. Venues and
+    artists are spread over cities with a skewed population, and shows pick
+    their venue and artist with Zipf-like popularity, so a few of each carry
+    most of the shows. A ``future`` fraction of the shows are upcoming (in
+    the next ``future_days``); the rest are spread over the ``past_days``
+    before ``now``. No venue or artist has two shows starting less than
+    ``show_duration`` minutes apart.
+
+    Rows are numbered from ``first_venue_id``/``first_artist_id`` so a
+    catalog can be added to an existing database.
+    """
+
+    def __init__(self, venues, artists, shows, seed=0, future=0.2, now=None,
+                 past_days=3 * 365, future_days=180, show_duration=120, first_venue_id=1, first_artist_id=1):
+        self.venues = venues
+        self.artists = artists
+        self.shows = shows
+        self.seed = seed
+        self.future = future
+        self.now = (now or datetime.now()).replace(minute=0, second=0, microsecond=0)
+        self.past_days = past_days
+        self.future_days = future_days
+        self.show_duration = show_duration
+        slots = (past_days + future_days) * len(show_slots(show_duration))
+        if shows > min(venues, artists) * slots:
+            raise ValueError(f'{shows} shows do not fit in the {slots} show slots of each venue and artist')
+        self.first_venue_id = first_venue_id
+        self.first_artist_id = first_artist_id
+
+        rng = self.random('places')
+        states = [code for code, _ in state_choices]
+        rng.shuffle(states)
+        city_names = [prefix + suffix for prefix in CITY_PREFIXES for suffix in CITY_SUFFIXES]
+        self.places = [
+            (city, state)
+            for state in states
+            for city in rng.sample(city_names, 8)
+        ]
+        rng.shuffle(self.places)
+        self.place_weights = zipf_cum_weights(len(self.places), 0.8)
+        self.genres = [name for name, _ in genre_choices]
+        rng.shuffle(self.genres)
+        self.genre_weights = zipf_cum_weights(len(self.genres), 0.7)
+
+    def random(self, stream):
+        # An independent generator per kind of row, so e.g. changing the
+        # number of shows leaves the venues and artists unchanged.
+        return random.Random(f'{self.seed}:{stream}')
+
+    def pick_genres(self, rng):
+        names = rng.choices(self.genres, cum_weights=self.genre_weights, k=rng.randint(1, 3))
+        return list(dict.fromkeys(names))
+
+    def phone(self, rng):
+        return f'{rng.randint(201, 989)}-{rng.randint(200, 999)}-{rng.randint(0, 9999):04d}'
+
+    def venue_rows(self):
+        """Yield ``(record, genre names)`` for each venue."""
+        rng = self.random('venues')
+        for venue_id in range(self.first_venue_id, self.first_venue_id + self.venues):
+            city, state = rng.choices(self.places, cum_weights=self.place_weights)[0]
+            name = f'The {rng.choice(VENUE_WORDS)} {rng.choice(VENUE_KINDS)}'
+            slug = f'{name.lower().replace(" ", "")}{venue_id}'
+            seeking_talent = rng.random() < 0.3
+            yield {
+                'id': venue_id,
+                'name': name,
+                'city': city,
+                'state': state,
+                'address': f'{rng.randint(1, 9999)} {rng.choice(STREETS)} Street',
+                'phone': self.phone(rng),
+                'image_link': f'https://picsum.photos/seed/venue{venue_id}/400/300',
+                'facebook_link': f'https://www.facebook.com/{slug}',
+                'website_link': f'https://www.{slug}.com',
+                'seeking_talent': seeking_talent,
+                'seeking_description': 'We are looking for local artists.' if seeking_talent else None,
+            }, self.pick_genres(rng)
+
+    def artist_rows(self):
+        """Yield ``(record, genre names)`` for each artist."""
+        rng = self.random('artists')
+        for artist_id in range(self.first_artist_id, self.first_artist_id + self.artists):
+            city, state = rng.choices(self.places, cum_weights=self.place_weights)[0]
+            name = rng.choice(ARTIST_FORMS).format(*rng.sample(ARTIST_WORDS, 2))
+            seeking_venue = rng.random() < 0.4
+            yield {
+                'id': artist_id,
+                'name': name,
+                'city': city,
+                'state': state,
+                'phone': self.phone(rng),
+                'image_link': f'https://picsum.photos/seed/artist{artist_id}/300/300',
+                'facebook_link': f'https://www.facebook.com/artist{artist_id}',
+                'website_link': None,
+                'seeking_venue': seeking_venue,
+                'seeking_description': 'Looking for shows in the area.' if seeking_venue else None,
+            }, self.pick_genres(rng)
+
+    def show_rows(self):
+        """Yield a record for each show."""
+        rng = self.random('shows')
+        # Popularity follows a shuffled ranking so busy venues and artists
+        # are not simply the lowest ids.
+        venue_ids = list(range(self.first_venue_id, self.first_venue_id + self.venues))
+        artist_ids = list(range(self.first_artist_id, self.first_artist_id + self.artists))
+        rng.shuffle(venue_ids)
+        rng.shuffle(artist_ids)
+        venue_weights = zipf_cum_weights(len(venue_ids))
+        artist_weights = zipf_cum_weights(len(artist_ids))
+        today = self.now.replace(hour=0)
+        slots = show_slots(self.show_duration)
+        past = [today + timedelta(days=days) + slot
+                for days in range(-self.past_days, 0) for slot in slots]
+        upcoming = [today + timedelta(days=days) + slot
+                    for days in range(1, self.future_days + 1) for slot in slots]
+        # The venues and artists already booked at each start time; a show
+        # takes a time and then draws a venue and an artist free at it,
+        # giving up on the time after a few draws.
+        booked_venues = {}
+        booked_artists = {}
+        remaining = self.shows
+        while remaining > 0:
+            start_time = rng.choice(upcoming if rng.random() < self.future else past)
+            venues = booked_venues.setdefault(start_time, set())
+            artists = booked_artists.setdefault(start_time, set())
+            venue_id = self.draw(rng, venue_ids, venue_weights, venues)
+            artist_id = self.draw(rng, artist_ids, artist_weights, artists)
+            if venue_id is None or artist_id is None:
+                continue
+            venues.add(venue_id)
+            artists.add(artist_id)
+            remaining -= 1
+            yield {
+                'venue_id': venue_id,
+                'artist_id': artist_id,
+                'start_time': start_time,
+            }
+
+    @staticmethod
+    def draw(rng, ids, cum_weights, booked, tries=100):
+        # A weighted pick out of ``ids`` not in ``booked``, or None.
+        for _ in range(tries):
+            ident = rng.choices(ids, cum_weights=cum_weights)[0]
+            if ident not in booked:
+                return ident
+        return None
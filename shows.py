@@ -0,0 +1,90 @@
+import sys
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+
+from extensions import db, response_cache
+from forms import ShowForm
+from helpers import (
+    booking_conflicts, format_datetime, invalidate_show, page_args, show_listing_query, show_serializer
+)
+from models import Show, ShowListing, count_show, list_show
+from pagination import keyset_page
+
+bp = Blueprint('shows', __name__)
+
+
+SHOWS_KEYS = (ShowListing.start_time, ShowListing.id)
+
+
+@bp.route('/shows')
+@response_cache.cached('shows')
+def shows():
+    # displays list of shows at /shows
+    page = keyset_page(show_listing_query(), SHOWS_KEYS, **page_args())
+    data = [show_serializer(show) for show in page.items]
+    return render_template('pages/shows.html', shows=data, page=page)
+
+
+@bp.route('/shows/create')
+def create_shows():
+    # renders form. do not touch.
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    # called to create new shows in the db, upon submitting new show listing form
+    form = ShowForm(request.form)
+    data = form.data.copy()
+    _ = data.pop('csrf_token')
+    error = False
+    missing = []
+    conflicts = []
+    try:
+        show = Show(**data)
+        # count_show() updates the venue and artist rows, which tells whether
+        # both exist before the show is inserted and keeps other bookings of
+        # either waiting until this one commits.
+        missing = count_show(show)
+        if not missing:
+            db.session.add(show)
+            db.session.flush()
+            conflicts = booking_conflicts(show.venue_id, show.artist_id, show.start_time, exclude=show.id)
+        if missing or conflicts:
+            db.session.rollback()
+        else:
+            list_show(show)
+            db.session.commit()
+            invalidate_show(show)
+    except Exception as e:
+        db.session.rollback()
+        error = True
+        sys.stdout.write(f'{e}')
+    finally:
+        db.session.close()
+        if missing or conflicts:
+            for model in missing:
+                flash(
+                    f'There is no {model.__tablename__} with id {data[f"{model.__tablename__}_id"]}',
+                    category='error-message'
+                )
+            for conflict in conflicts:
+                flash(
+                    f'The {conflict.kind} already has a show at {format_datetime(conflict.start_time, "full")}',
+                    category='error-message'
+                )
+            return render_template('forms/new_show.html', form=form)
+        if not error:
+            flash(
+                'Show was successfully listed!',
+                category='success-message'
+            )
+            return redirect(url_for('shows.shows'))
+        else:
+            flash(
+                'An Error occurred while creating Show',
+                category='error-message'
+            )
+
+    return render_template('pages/home.html')
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|\?|:\w+|\$\d+')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize_sql(statement):
+    # One form of a statement for all its literals, bind styles and IN-list
+    # lengths, e.g. "SELECT venue.id FROM venue WHERE venue.id IN (?...)".
+    sql = _STRING.sub('?', statement)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _VALUE_LIST.sub('(?...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _shape(parameters):
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def parameter_shape(parameters, executemany):
+    # The types of the bind parameters, never their values.
+    if executemany:
+        return {'rows': len(parameters), 'row': _shape(parameters[0]) if parameters else None}
+    return _shape(parameters)
+
+
+class TopQueries:
+    """The ``size`` statements with the worst single duration.
+
+    Statements are grouped by their normalized SQL; each entry keeps the
+    number of slow runs, their total and worst duration, and the route and
+    plan of the worst run.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            entry = self._entries.get(record['sql'])
+            if entry is None:
+                entry = self._entries[record['sql']] = {
+                    'sql': record['sql'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            entry['count'] += 1
+            entry['total_ms'] = round(entry['total_ms'] + record['duration_ms'], 3)
+            if record['duration_ms'] >= entry['max_ms']:
+                entry.update(
+                    max_ms=record['duration_ms'], route=record['route'],
+                    parameters=record['parameters'], plan=record.get('plan'), at=record['at'])
+            if len(self._entries) > self.size:
+                smallest = min(self._entries.values(), key=lambda item: item['max_ms'])
+                del self._entries[smallest['sql']]
+
+    def entries(self):
+        with self._lock:
+            return sorted((dict(entry) for entry in self._entries.values()),
+                          key=lambda item: item['max_ms'], reverse=True)
+
+
+def explain(connection, statement, parameters, analyze=False):
+    """Return the plan of ``statement`` as a list of lines, or None.
+
+    Runs on a raw DBAPI cursor of the same connection, so the plan sees the
+    same transaction and emits no engine events of its own.
+    """
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif dialect == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if analyze else 'EXPLAIN '
+    else:
+        return None
+    cursor = connection.connection.cursor()
+    savepoint = dialect == 'postgresql'
+    try:
+        if savepoint:
+            # A failed EXPLAIN must not abort the request's transaction.
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except connection.dialect.dbapi.Error:
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            return None
+        finally:
+            if savepoint:
+                cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    finally:
+        cursor.close()
+    if dialect == 'sqlite':
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def log_path(app):
+    # SLOW_QUERY_LOG, or slow_queries.log in the instance folder, out of the
+    # source tree.
+    return app.config.get('SLOW_QUERY_LOG') or os.path.join(app.instance_path, 'slow_queries.log')
+
+
+class SlowQueryLog:
+    """Log SQL statements slower than ``SLOW_QUERY_THRESHOLD_MS``.
+
+    Each slow statement is written as one JSON line to the rotating
+    ``SLOW_QUERY_LOG`` file with its normalized SQL, parameter types, route,
+    duration and, for SELECTs, the EXPLAIN plan (EXPLAIN ANALYZE on
+    Postgres when ``SLOW_QUERY_EXPLAIN_ANALYZE`` is set, which runs the
+    statement a second time). The worst ``SLOW_QUERY_TOP`` statements of
+    this process are kept in ``top``.
+
+    A threshold of 0 or less turns the log off.
+    """
+
+    def __init__(self, app=None):
+        self.threshold = 0
+        self.analyze = False
+        self.top = TopQueries(20)
+        self.logger = logging.getLogger('fyyur.slow_queries')
+        self.logger.propagate = False
+        self.handler = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.threshold = app.config.get('SLOW_QUERY_THRESHOLD_MS', 0) / 1000
+        self.analyze = app.config.get('SLOW_QUERY_EXPLAIN_ANALYZE', False)
+        self.top = TopQueries(app.config.get('SLOW_QUERY_TOP', 20))
+        app.extensions['slow_query_log'] = self
+        if self.threshold <= 0:
+            return
+        path = os.path.abspath(log_path(app))
+        if self.handler is None or self.handler.baseFilename != path:
+            if self.handler is not None:
+                self.logger.removeHandler(self.handler)
+                self.handler.close()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.handler = RotatingFileHandler(
+                path,
+                maxBytes=app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+                backupCount=app.config.get('SLOW_QUERY_LOG_BACKUPS', 5))
+            self.handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger.addHandler(self.handler)
+            self.logger.setLevel(logging.INFO)
+        if not event.contains(Engine, 'after_cursor_execute', self._after_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_slow_query_started', None)
+        if started is None or self.threshold <= 0:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold:
+            return
+        record = {
+            'at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'duration_ms': round(elapsed * 1000, 3),
+            'route': request.endpoint if has_request_context() else None,
+            'sql': normalize_sql(statement),
+            'parameters': parameter_shape(parameters, executemany),
+        }
+        if not executemany and statement.lstrip()[:6].upper().startswith(('SELECT', 'WITH')):
+            record['plan'] = explain(conn, statement, parameters, self.analyze)
+        self.top.add(record)
+        self.logger.info(json.dumps(record, default=str))
+
+
+def read_log(paths):
+    """Yield the records of slow query log files, skipping unreadable lines."""
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
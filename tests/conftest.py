@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DB_URL', 'sqlite://')
+
+
+@pytest.fixture
+def app(tmp_path):
+    from app import create_app
+    from extensions import db
+    from models import Artist, Venue
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "fyyur.db"}',
+        'CACHE_TYPE': 'null',
+        'TEMPLATE_CACHE_DIR': None,
+        'TESTING': True,
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(Venue(id=1, name='The Musical Hop', city='San Francisco', state='CA'))
+        db.session.add(Artist(id=1, name='Guns N Petals', city='San Francisco', state='CA'))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.get_engine().dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
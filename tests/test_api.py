@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from extensions import db
+from models import Venue
+
+
+@pytest.fixture
+def app(app):
+    with app.app_context():
+        for ident in range(2, 6):
+            db.session.add(Venue(id=ident, name=f'Venue {ident}', city='New York', state='NY'))
+        db.session.commit()
+    return app
+
+
+def create_show(client, start_time):
+    response = client.post('/shows/create', data={'venue_id': '1', 'artist_id': '1', 'start_time': start_time})
+    assert response.status_code == 302
+
+
+def walk(client, url, link):
+    # The ids of every page, following the next or prev links, and the last
+    # page's response.
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+        pages.append([row['id'] for row in response.json['data']])
+        url = response.json[link]
+    return pages, response
+
+
+def test_collection_pages(client):
+    pages, last = walk(client, '/api/v1/venues?per_page=2', 'next')
+    assert pages == [[1, 2], [3, 4], [5]]
+    pages, first = walk(client, last.json['prev'], 'prev')
+    assert pages == [[3, 4], [1, 2]]
+    assert first.json['prev'] is None
+
+
+def test_collection_filters(client):
+    response = client.get('/api/v1/venues?state=NY')
+    assert [row['id'] for row in response.json['data']] == [2, 3, 4, 5]
+
+
+@pytest.mark.parametrize('headers, query', [
+    ({}, '?format=ndjson'),
+    ({'Accept': 'application/x-ndjson'}, ''),
+])
+def test_collection_ndjson(app, client, headers, query):
+    app.config['API_STREAM_BATCH'] = 2
+    response = client.get(f'/api/v1/venues{query}', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['id'] for line in lines] == [1, 2, 3, 4, 5]
+
+
+def test_shows(client):
+    create_show(client, '2030-01-02 20:00:00')
+    create_show(client, '2030-01-01 20:00:00')
+    response = client.get('/api/v1/shows')
+    assert [(row['start_time'], row['venue_name']) for row in response.json['data']] == [
+        ('2030-01-01T20:00:00', 'The Musical Hop'),
+        ('2030-01-02T20:00:00', 'The Musical Hop'),
+    ]
+
+
+def test_detail(client):
+    response = client.get('/api/v1/venues/1')
+    assert response.status_code == 200
+    assert response.json['name'] == 'The Musical Hop'
+    assert client.get('/api/v1/artists/1').json['name'] == 'Guns N Petals'
+
+
+@pytest.mark.parametrize('url', [
+    '/api/v1/venues/99',
+    '/api/v1/artists/99',
+    '/api/v1/venues/99/calendar',
+    '/api/v1/artists/99/calendar',
+])
+def test_missing(client, url):
+    assert client.get(url).status_code == 404
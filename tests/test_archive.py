@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+
+from extensions import db
+from models import Artist, Show, ShowArchive, ShowListing, Venue, archive_shows, refresh_show_counters
+
+
+@pytest.fixture
+def runner(app):
+    from commands import cli
+
+    app.cli.add_command(cli)
+    return app.test_cli_runner()
+
+
+def create_show(client, start_time):
+    response = client.post('/shows/create', data={'venue_id': '1', 'artist_id': '1', 'start_time': start_time})
+    assert response.status_code == 302
+
+
+def counts(app):
+    with app.app_context():
+        return [
+            (entity.upcoming_shows_count, entity.past_shows_count)
+            for entity in (db.session.get(Venue, 1), db.session.get(Artist, 1))
+        ]
+
+
+def show_ids(app, model):
+    with app.app_context():
+        return [show_id for (show_id,) in db.session.query(model.id).order_by(model.id)]
+
+
+@pytest.fixture
+def shows(app, client):
+    create_show(client, '2020-01-01 20:00:00')
+    create_show(client, '2020-02-01 20:00:00')
+    create_show(client, '2030-01-01 20:00:00')
+    client.get('/')  # show the flashed messages
+    with app.app_context():
+        refresh_show_counters()
+        db.session.commit()
+
+
+def test_archive_keeps_pages(app, client, shows):
+    pages = [client.get(url).data for url in ('/venues/1', '/artists/1', '/shows')]
+    assert b'2 Past Shows' in pages[0]
+    before = counts(app)
+    with app.app_context():
+        assert archive_shows(datetime(2021, 1, 1), batch_size=1) == 2
+    assert show_ids(app, Show) == [3]
+    assert show_ids(app, ShowArchive) == [1, 2]
+    assert show_ids(app, ShowListing) == [1, 2, 3]
+    assert counts(app) == before
+    assert [client.get(url).data for url in ('/venues/1', '/artists/1', '/shows')] == pages
+
+
+def test_archive_stops_at_rollover(app, shows):
+    with app.app_context():
+        assert archive_shows(datetime(2031, 1, 1)) == 2
+    assert show_ids(app, Show) == [3]
+
+
+def test_archived_ids_are_not_reused(app, client, shows):
+    with app.app_context():
+        db.session.query(Show).filter(Show.id == 3).delete()
+        db.session.commit()
+        archive_shows(datetime(2021, 1, 1))
+    create_show(client, '2030-02-01 20:00:00')
+    assert show_ids(app, Show) == [4]
+
+
+def test_archive_command(app, runner, shows):
+    result = runner.invoke(args=['fyyur', 'archive-shows', '--days', '90'])
+    assert result.exit_code == 0, result.output
+    assert result.output == '2 shows archived\n'
+    assert show_ids(app, ShowArchive) == [1, 2]
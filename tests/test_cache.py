@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from extensions import response_cache
+
+
+@pytest.fixture
+def app(app, tmp_path):
+    # The conftest app with the memory page cache, reading from a "replica"
+    # on the same database file.
+    app.config['SQLALCHEMY_BINDS'] = {'replica': app.config['SQLALCHEMY_DATABASE_URI']}
+    app.config['CACHE_TYPE'] = 'memory'
+    response_cache.init_app(app)
+    yield app
+    response_cache.init_app(app)
+
+
+def test_replica_pages_not_stored_right_after_invalidation(app, client):
+    with app.app_context():
+        response_cache.invalidate('venues')
+    assert client.get('/venues').headers['X-Cache'] == 'MISS'
+    assert client.get('/venues').headers['X-Cache'] == 'MISS'
+
+
+def test_replica_pages_stored_once_replica_caught_up(app, client, monkeypatch):
+    with app.app_context():
+        response_cache.invalidate('venues')
+    later = time.time() + app.config['REPLICA_READ_YOUR_WRITES_SECONDS']
+    monkeypatch.setattr(time, 'time', lambda: later)
+    assert client.get('/venues').headers['X-Cache'] == 'MISS'
+    assert client.get('/venues').headers['X-Cache'] == 'HIT'
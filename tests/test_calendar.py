@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import pytest
+
+from extensions import db
+from models import Show
+
+
+@pytest.fixture
+def shows(app):
+    with app.app_context():
+        for start_time in ('2030-02-28 23:00', '2030-03-01 00:00', '2030-03-01 21:00', '2030-03-31 23:59',
+                           '2030-04-01 00:00'):
+            db.session.add(Show(venue_id=1, artist_id=1, start_time=datetime.fromisoformat(start_time)))
+        db.session.commit()
+
+
+@pytest.mark.parametrize('url', ['/api/v1/venues/1/calendar', '/api/v1/artists/1/calendar'])
+def test_month(shows, client, url):
+    response = client.get(f'{url}?month=2030-03')
+    assert response.status_code == 200
+    assert response.json['start'] == '2030-03-01'
+    assert response.json['end'] == '2030-04-01'
+    assert [(day['date'], [show['start_time'] for show in day['shows']]) for day in response.json['days']] == [
+        ('2030-03-01', ['2030-03-01T00:00:00', '2030-03-01T21:00:00']),
+        ('2030-03-31', ['2030-03-31T23:59:00']),
+    ]
+
+
+def test_range(shows, client):
+    response = client.get('/api/v1/venues/1/calendar?start=2030-02-28&end=2030-03-01')
+    assert response.json['end'] == '2030-03-01'
+    assert [day['date'] for day in response.json['days']] == ['2030-02-28']
+
+    response = client.get('/api/v1/venues/1/calendar?start=2030-03-31')
+    assert response.json['end'] == '2030-04-01'
+    assert [day['date'] for day in response.json['days']] == ['2030-03-31']
+
+
+def test_page(shows, client):
+    response = client.get('/venues/1/calendar?month=2030-03')
+    assert response.status_code == 200
+    assert b'Friday March 01, 2030' in response.data
+    assert b'Sunday March 31, 2030' in response.data
+    assert b'February 28' not in response.data
+    assert b'April 01' not in response.data
+    assert b'month=2030-02' in response.data
+    assert b'month=2030-04' in response.data
+
+    response = client.get('/venues/1/calendar?month=2031-03')
+    assert b'No shows booked.' in response.data
+
+
+@pytest.mark.parametrize('query', [
+    'month=9999-12',
+    'month=2022-13',
+    'start=2022-06-10&end=2022-06-01',
+    'start=2022-01-01&end=2024-01-01',
+])
+def test_bad_range(client, query):
+    assert client.get(f'/venues/1/calendar?{query}').status_code == 400
+    assert client.get(f'/api/v1/venues/1/calendar?{query}').status_code == 400
+
+
+def test_links_stop_at_the_last_date(client):
+    response = client.get('/venues/1/calendar?start=9999-12-01&end=9999-12-31')
+    assert response.status_code == 200
+    assert b'start=9999-11-01' in response.data
+    assert b'Later' not in response.data
+
+    response = client.get('/venues/1/calendar?month=9999-11')
+    assert response.status_code == 200
+    assert b'month=9999-10' in response.data
+    assert b'Later' not in response.data
+
+
+def test_links_stop_at_the_first_date(client):
+    response = client.get('/artists/1/calendar?month=0001-01')
+    assert response.status_code == 200
+    assert b'Earlier' not in response.data
+    assert b'month=0001-02' in response.data
@@ -0,0 +1,105 @@
+from datetime import datetime
+
+import pytest
+
+from extensions import db
+from models import Artist, Show, Venue
+
+
+@pytest.fixture
+def app(app):
+    # Page versions are only checked with templates not reloaded from disk.
+    app.config['TEMPLATES_AUTO_RELOAD'] = False
+    app.jinja_env.auto_reload = False
+    with app.app_context():
+        db.session.add(Show(venue_id=1, artist_id=1, start_time=datetime(2030, 1, 1, 20)))
+        db.session.commit()
+    return app
+
+
+def venue_form(**values):
+    return {
+        'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom Street',
+        'phone': '415-555-1234', 'genres': ['Jazz'], 'facebook_link': 'https://www.facebook.com/hop',
+        **values,
+    }
+
+
+def updated_at(app):
+    with app.app_context():
+        return db.session.get(Venue, 1).updated_at, db.session.get(Artist, 1).updated_at
+
+
+def test_edit_keeps_partner_pages(app, client):
+    venue_before, artist_before = updated_at(app)
+    client.post('/venues/1/edit', data=venue_form(city='Oakland'))
+    venue_after, artist_after = updated_at(app)
+    assert venue_after > venue_before
+    assert artist_after == artist_before
+
+
+@pytest.mark.parametrize('change', [{'name': 'The Hop'}, {'image_link': 'https://example.com/hop.png'}])
+def test_listed_edit_touches_partner_pages(app, client, change):
+    _, artist_before = updated_at(app)
+    client.post('/venues/1/edit', data=venue_form(**change))
+    _, artist_after = updated_at(app)
+    assert artist_after > artist_before
+
+
+@pytest.mark.parametrize('url', ['/venues/1', '/artists/1'])
+def test_not_modified(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    etag, _ = response.get_etag()
+    assert etag
+
+    response = client.get(url, headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304
+    assert response.get_etag() == (etag, False)
+    assert response.data == b''
+
+    assert client.get(url, headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_edit_changes_etags(app, client):
+    venue_etag = client.get('/venues/1').get_etag()[0]
+    artist_etag = client.get('/artists/1').get_etag()[0]
+    # Following the redirect shows the flashed message, which is never cached.
+    response = client.post('/venues/1/edit', data=venue_form(name='The Hop'), follow_redirects=True)
+    assert response.get_etag() == (None, None)
+
+    response = client.get('/venues/1', headers={'If-None-Match': f'"{venue_etag}"'})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != venue_etag
+    response = client.get('/artists/1', headers={'If-None-Match': f'"{artist_etag}"'})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != artist_etag
+
+
+def test_no_etag_while_templates_reload(app, client):
+    app.config['TEMPLATES_AUTO_RELOAD'] = True
+    response = client.get('/venues/1')
+    assert response.status_code == 200
+    assert response.get_etag() == (None, None)
+
+
+def test_unknown_page_is_not_found(client):
+    assert client.get('/venues/99', headers={'If-None-Match': '*'}).status_code == 404
+
+
+@pytest.mark.parametrize('config, version', [
+    ({'BUILD_VERSION': 'abc123'}, 'abc123'),
+    ({'TEMPLATES_AUTO_RELOAD': True}, 'dev'),
+])
+def test_build_version(config, version):
+    from app import create_app
+
+    assert create_app(config).config['BUILD_VERSION'] == version
+
+
+def test_build_version_hashes_sources():
+    from app import create_app
+
+    version = create_app({'TEMPLATES_AUTO_RELOAD': False}).config['BUILD_VERSION']
+    assert version != 'dev'
+    assert create_app({'TEMPLATES_AUTO_RELOAD': False}).config['BUILD_VERSION'] == version
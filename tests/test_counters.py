@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pytest
+
+from extensions import db
+from models import Artist, Venue, refresh_show_counters, rollover_show_counters
+
+
+@pytest.fixture
+def app(app):
+    with app.app_context():
+        db.session.add(Artist(id=2, name='The Wild Sax Band', city='San Francisco', state='CA'))
+        db.session.commit()
+    return app
+
+
+def create_show(client, artist_id, start_time):
+    response = client.post('/shows/create', data={
+        'venue_id': '1', 'artist_id': str(artist_id), 'start_time': start_time})
+    assert response.status_code == 302
+
+
+def counters(model, ident):
+    entity = db.session.get(model, ident)
+    return entity.upcoming_shows_count, entity.past_shows_count
+
+
+def test_shows_are_counted_when_created(app, client):
+    create_show(client, 1, '2030-01-01 20:00:00')
+    create_show(client, 2, '2030-01-02 20:00:00')
+    create_show(client, 2, '2020-01-01 20:00:00')
+    with app.app_context():
+        assert counters(Venue, 1) == (2, 1)
+        assert counters(Artist, 1) == (1, 0)
+        assert counters(Artist, 2) == (1, 1)
+
+
+def test_rollover_moves_started_shows_to_past(app, client):
+    create_show(client, 1, '2030-01-01 20:00:00')
+    create_show(client, 2, '2030-06-01 20:00:00')
+    with app.app_context():
+        assert rollover_show_counters(datetime(2030, 3, 1)) == 1
+        assert counters(Venue, 1) == (1, 1)
+        assert counters(Artist, 1) == (0, 1)
+        assert counters(Artist, 2) == (1, 0)
+        # Only the shows since the last rollover are moved.
+        assert rollover_show_counters(datetime(2030, 3, 1)) == 0
+        assert rollover_show_counters(datetime(2030, 7, 1)) == 1
+        assert counters(Venue, 1) == (0, 2)
+
+
+def test_recount_matches(app, client):
+    create_show(client, 1, '2030-01-01 20:00:00')
+    create_show(client, 2, '2020-01-01 20:00:00')
+    with app.app_context():
+        before = [counters(model, ident) for model, ident in ((Venue, 1), (Artist, 1), (Artist, 2))]
+        db.session.query(Venue).update({'upcoming_shows_count': 7, 'past_shows_count': 7})
+        refresh_show_counters()
+        db.session.commit()
+        assert [counters(model, ident) for model, ident in ((Venue, 1), (Artist, 1), (Artist, 2))] == before
+
+
+def test_deleting_a_venue_uncounts_its_artists(app, client):
+    create_show(client, 1, '2030-01-01 20:00:00')
+    create_show(client, 1, '2020-01-01 20:00:00')
+    client.delete('/venues/1')
+    with app.app_context():
+        assert db.session.get(Venue, 1) is None
+        assert counters(Artist, 1) == (0, 0)
@@ -0,0 +1,55 @@
+import pytest
+
+from extensions import db
+from helpers import facet_counts
+from models import Genre, Venue
+
+
+@pytest.fixture
+def app(app):
+    with app.app_context():
+        jazz, blues = Genre(name='Jazz'), Genre(name='Blues')
+        db.session.add_all([
+            Venue(id=2, name='Blue Note', city='San Francisco', state='CA', genres=[jazz]),
+            Venue(id=3, name='Village Vanguard', city='New York', state='NY', genres=[jazz, blues]),
+            Venue(id=4, name='Terra Blues', city='New York', state='NY', genres=[blues]),
+            Venue(id=5, name='Iridium', city='Buffalo', state='NY', genres=[blues]),
+        ])
+        db.session.commit()
+    return app
+
+
+FILTERS = {'genre': None, 'state': None, 'city': None}
+
+
+def test_counts(app):
+    with app.app_context():
+        assert facet_counts(Venue, FILTERS) == {
+            'genre': [('Blues', 3), ('Jazz', 2)],
+            'state': [('NY', 3), ('CA', 2)],
+            'city': [('New York', 2), ('San Francisco', 2), ('Buffalo', 1)],
+        }
+
+
+def test_each_facet_is_counted_under_the_other_filters(app):
+    with app.app_context():
+        counts = facet_counts(Venue, dict(FILTERS, state='NY', genre='Jazz'))
+    assert counts['genre'] == [('Blues', 3), ('Jazz', 1)]
+    assert counts['state'] == [('CA', 1), ('NY', 1)]
+    assert counts['city'] == [('New York', 1)]
+
+
+def test_counts_are_limited(app):
+    app.config['FACET_LIMIT'] = 1
+    with app.app_context():
+        counts = facet_counts(Venue, FILTERS)
+    assert counts['city'] == [('New York', 2)]
+
+
+def test_listing_filters(client):
+    response = client.get('/venues?genre=Blues&state=NY')
+    assert b'Village Vanguard' in response.data and b'Iridium' in response.data
+    assert b'Blue Note' not in response.data
+
+    data = client.get('/api/v1/venues?genre=Jazz').get_json()['data']
+    assert [venue['name'] for venue in data] == ['Blue Note', 'Village Vanguard']
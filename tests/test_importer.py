@@ -0,0 +1,108 @@
+import csv
+from datetime import datetime
+
+import pytest
+
+from extensions import db
+from models import Show, ShowListing, Venue
+
+
+@pytest.fixture
+def runner(app):
+    from commands import cli
+
+    app.cli.add_command(cli)
+    return app.test_cli_runner()
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def venue_row(**values):
+    return {
+        'id': '', 'name': 'The Hop', 'city': 'San Francisco', 'state': 'CA', 'address': '1 Main Street',
+        'phone': '415-555-1234', 'genres': 'Jazz,Blues', 'facebook_link': 'https://www.facebook.com/hop',
+        **values,
+    }
+
+
+def show_row(venue_id, artist_id, start_time):
+    return {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time}
+
+
+def test_rejected_rows_are_reported(app, runner, tmp_path):
+    path = write_csv(tmp_path / 'venues.csv', [
+        venue_row(name='Good'),
+        venue_row(name=''),
+        venue_row(name='Bad phone', phone='123'),
+    ])
+    result = runner.invoke(args=['fyyur', 'import', '--venues', path, '--jobs', '1'])
+    assert result.exit_code == 1
+    assert f'{path}:3: name: This field is required.' in result.output
+    assert f'{path}:4: phone: Invalid phone number.' in result.output
+    assert '2 rows were rejected' in result.output
+    with app.app_context():
+        assert [venue.name for venue in Venue.query.order_by(Venue.id)] == ['The Musical Hop', 'Good']
+
+
+def test_ids(app, runner, tmp_path):
+    venues = write_csv(tmp_path / 'venues.csv', [
+        venue_row(id='10', name='Ten'),
+        venue_row(name='Numbered'),
+        venue_row(id='1', name='Taken'),
+    ])
+    shows = write_csv(tmp_path / 'shows.csv', [
+        show_row('10', '1', '2030-01-01 20:00:00'),
+        show_row('99', '1', '2030-01-02 20:00:00'),
+    ])
+    result = runner.invoke(args=['fyyur', 'import', '--venues', venues, '--shows', shows, '--jobs', '1'])
+    assert f'{venues}:4: id: venue 1 already exists' in result.output
+    assert f'{shows}:3: venue_id: no venue with id 99' in result.output
+    with app.app_context():
+        assert {venue.id: venue.name for venue in Venue.query} == {1: 'The Musical Hop', 10: 'Ten', 11: 'Numbered'}
+        assert [(show.venue_id, show.artist_id) for show in Show.query] == [(10, 1)]
+        assert db.session.get(Venue, 10).upcoming_shows_count == 1
+        assert ShowListing.query.count() == 1
+        venue = Venue(name='Next', city='San Francisco', state='CA')
+        db.session.add(venue)
+        db.session.commit()
+        assert venue.id == 12
+
+
+def test_failing_rows_are_retried_alone(app, runner, tmp_path):
+    with app.app_context():
+        db.session.execute(db.text(
+            "CREATE TRIGGER reject_bad BEFORE INSERT ON venue WHEN NEW.name = 'Bad' "
+            "BEGIN SELECT RAISE(ABORT, 'bad venue'); END"))
+        db.session.commit()
+    path = write_csv(tmp_path / 'venues.csv', [venue_row(name=name) for name in 'ABCDEFG'] + [venue_row(name='Bad')])
+    result = runner.invoke(args=['fyyur', 'import', '--venues', path, '--batch-size', '3', '--jobs', '1'])
+    assert f'{path}:9: bad venue' in result.output
+    assert '1 rows were rejected' in result.output
+    with app.app_context():
+        assert sorted(venue.name for venue in Venue.query)[:-1] == list('ABCDEFG')
+
+
+def test_double_bookings_are_rejected(app, runner, tmp_path):
+    with app.app_context():
+        db.session.add(Show(venue_id=1, artist_id=1, start_time=datetime(2030, 1, 1, 20)))
+        db.session.commit()
+    venues = write_csv(tmp_path / 'venues.csv', [venue_row(id='2', name='Two')])
+    shows = write_csv(tmp_path / 'shows.csv', [
+        show_row('1', '1', '2030-01-01 21:00:00'),
+        show_row('2', '1', '2030-01-02 20:00:00'),
+        show_row('2', '1', '2030-01-02 21:59:00'),
+        show_row('2', '1', '2030-01-02 22:00:00'),
+    ])
+    result = runner.invoke(args=['fyyur', 'import', '--venues', venues, '--shows', shows, '--jobs', '1'])
+    assert f'{shows}:2: start_time: the venue already has a show at 2030-01-01 20:00:00' in result.output
+    assert f'{shows}:4: start_time: the venue already has a show at 2030-01-02 20:00:00' in result.output
+    assert '2 rows were rejected' in result.output
+    with app.app_context():
+        assert sorted(show.start_time.hour for show in Show.query) == [20, 20, 22]
+        assert ShowListing.query.count() == 2
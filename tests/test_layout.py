@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.mark.parametrize('method, path, action', [
+    ('GET', '/venues', '/venues/search'),
+    ('POST', '/venues/search', '/venues/search'),
+    ('GET', '/venues/1', '/venues/search'),
+    ('GET', '/artists', '/artists/search'),
+    ('POST', '/artists/search', '/artists/search'),
+    ('GET', '/artists/1', '/artists/search'),
+])
+def test_search_form(client, method, path, action):
+    response = client.open(path, method=method, data={'search_term': 'the'})
+    assert response.status_code == 200
+    assert f'action="{action}"'.encode() in response.data
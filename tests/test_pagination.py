@@ -0,0 +1,80 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from artists import ARTISTS_KEYS, artists_query
+from extensions import db
+from models import Artist
+from pagination import encode_cursor, keyset_page
+
+
+@pytest.fixture
+def app(app):
+    # Seven artists, with repeated names whose ties the id breaks.
+    with app.app_context():
+        for artist_id, name in enumerate(['Echo', 'Band', 'Echo', 'Apex', 'Band', 'Zed'], 2):
+            db.session.add(Artist(id=artist_id, name=name, city='San Francisco', state='CA'))
+        db.session.commit()
+    return app
+
+
+def all_artists():
+    return [(artist.id, artist.name) for artist in artists_query({}).order_by(*ARTISTS_KEYS)]
+
+
+def walk(per_page, **cursor):
+    # The pages of the artists listing followed from ``cursor`` to the end.
+    pages = []
+    while True:
+        page = keyset_page(artists_query({}), ARTISTS_KEYS, per_page, **cursor)
+        pages.append(page)
+        if cursor.get('before'):
+            if page.prev_cursor is None:
+                return pages[::-1]
+            cursor = {'before': page.prev_cursor}
+        else:
+            if page.next_cursor is None:
+                return pages
+            cursor = {'after': page.next_cursor}
+
+
+def test_forward_and_back(app):
+    with app.app_context():
+        expected = all_artists()
+        forward = walk(3)
+        assert [[(row.id, row.name) for row in page.items] for page in forward] == [
+            expected[0:3], expected[3:6], expected[6:7]]
+        assert forward[0].prev_cursor is None
+
+        back = walk(3, before=forward[-1].prev_cursor)
+        assert [(row.id, row.name) for page in back for row in page.items] == expected[:6]
+
+
+def test_ties_are_ordered_by_id(app):
+    with app.app_context():
+        assert all_artists() == [
+            (5, 'Apex'), (3, 'Band'), (6, 'Band'), (2, 'Echo'), (4, 'Echo'), (1, 'Guns N Petals'), (7, 'Zed')]
+        page = keyset_page(artists_query({}), ARTISTS_KEYS, 2, after=encode_cursor(['Band', 3]))
+        assert [row.id for row in page.items] == [6, 2]
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor', encode_cursor(['Band']), '!!'])
+def test_malformed_cursor_gives_the_first_page(app, cursor):
+    with app.app_context():
+        page = keyset_page(artists_query({}), ARTISTS_KEYS, 2, after=cursor)
+        assert [row.id for row in page.items] == [5, 3]
+
+
+def test_listing_links(client):
+    response = client.get('/artists?per_page=3')
+    assert b'Apex' in response.data and b'Echo' not in response.data
+    after = next(link for link in links(response.data) if 'after' in link)['after']
+    response = client.get(f'/artists?per_page=3&after={after}')
+    assert b'Echo' in response.data and b'Apex' not in response.data
+
+
+def links(html):
+    for chunk in html.decode().split('href="')[1:]:
+        url = chunk.split('"', 1)[0].replace('&amp;', '&')
+        if url.startswith('/artists?'):
+            yield {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
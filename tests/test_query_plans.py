@@ -0,0 +1,53 @@
+import re
+from datetime import datetime
+
+import pytest
+from flask import current_app
+from sqlalchemy import tuple_
+
+from extensions import db
+from helpers import artist_shows_query, calendar_query, show_listing_query, venue_shows_query
+from models import Artist, ShowListing, Venue
+
+
+def plan_check_queries():
+    # The show reads made by the serializers, listings and calendars, keyed
+    # by name.
+    now = datetime.now()
+    return {
+        'venue detail shows': venue_shows_query(1),
+        'artist detail shows': artist_shows_query(1),
+        'shows listing page': show_listing_query().filter(
+            tuple_(ShowListing.start_time, ShowListing.id) > tuple_(now, 0)
+        ).order_by(ShowListing.start_time, ShowListing.id).limit(current_app.config['PAGE_SIZE'] + 1),
+        'venue calendar': calendar_query(Venue, 1, datetime(2030, 1, 1), datetime(2030, 2, 1)),
+        'artist calendar': calendar_query(Artist, 1, datetime(2020, 1, 1), datetime(2020, 2, 1)),
+    }
+
+
+def explain(query):
+    # Return the plan lines of ``query`` and the subset of them that scan a
+    # whole table. On Postgres sequential scans are disabled for the check so
+    # that a plan only contains one when no usable index exists.
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    with db.engine.begin() as connection:
+        if db.engine.dialect.name == 'postgresql':
+            connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            lines = [row[0] for row in connection.exec_driver_sql(f'EXPLAIN {compiled}', params)]
+            return lines, [line for line in lines if 'Seq Scan' in line]
+        lines = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params)]
+        # A table read whole in the order of one of its indexes is still a
+        # scan of the whole table.
+        return lines, [line for line in lines if re.fullmatch(r'SCAN \w+( USING (COVERING )?INDEX \w+)?', line)]
+
+
+@pytest.mark.parametrize('name', [
+    'venue detail shows', 'artist detail shows', 'shows listing page', 'venue calendar', 'artist calendar',
+])
+def test_no_sequential_scans(app, name):
+    with app.app_context():
+        lines, scans = explain(plan_check_queries()[name])
+    assert not scans, '\n'.join(lines)
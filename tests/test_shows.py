@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import pytest
+
+from extensions import db
+from models import Show, ShowArchive, ShowListing
+
+
+@pytest.mark.parametrize('venue_id, artist_id, message', [
+    ('2', '1', b'There is no venue with id 2'),
+    ('1', '2', b'There is no artist with id 2'),
+])
+def test_create_show_unknown_venue_or_artist(app, client, venue_id, artist_id, message):
+    response = client.post('/shows/create', data={
+        'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2030-01-01 20:00:00'})
+    assert response.status_code == 200
+    assert message in response.data
+    assert b'<title>New Show Listing</title>' in response.data
+    with app.app_context():
+        assert db.session.query(Show).count() == 0
+        assert db.session.query(ShowListing).count() == 0
+
+
+def test_create_show(app, client):
+    response = client.post('/shows/create', data={
+        'venue_id': '1', 'artist_id': '1', 'start_time': '2030-01-01 20:00:00'})
+    assert response.status_code == 302
+    with app.app_context():
+        assert db.session.query(Show).count() == 1
+        assert db.session.query(ShowListing).count() == 1
+
+
+@pytest.mark.parametrize('model', [Show, ShowArchive])
+def test_create_show_double_booked(app, client, model):
+    with app.app_context():
+        db.session.add(model(id=1, venue_id=1, artist_id=1, start_time=datetime(2020, 1, 1, 20)))
+        db.session.commit()
+    response = client.post('/shows/create', data={
+        'venue_id': '1', 'artist_id': '1', 'start_time': '2020-01-01 21:00:00'})
+    assert response.status_code == 200
+    assert b'The venue already has a show at' in response.data
+    assert b'The artist already has a show at' in response.data
+    with app.app_context():
+        assert db.session.query(Show).count() == (model is Show)
@@ -0,0 +1,30 @@
+import json
+import os
+
+from app import create_app
+from extensions import slow_query_log
+from slowlog import log_path
+
+
+def test_off_by_default_in_the_instance_folder(app):
+    assert app.config['SLOW_QUERY_THRESHOLD_MS'] == 0
+    assert slow_query_log.threshold == 0
+    assert log_path(app) == os.path.join(app.instance_path, 'slow_queries.log')
+
+
+def test_slow_statements_are_logged(tmp_path, client):
+    path = tmp_path / 'slow' / 'slow_queries.log'
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "fyyur.db"}',
+        'CACHE_TYPE': 'null',
+        'TEMPLATE_CACHE_DIR': None,
+        'TESTING': True,
+        'SLOW_QUERY_THRESHOLD_MS': 1e-6,
+        'SLOW_QUERY_LOG': str(path),
+    })
+    assert log_path(app) == str(path)
+    assert app.test_client().get('/venues/1').status_code == 200
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    assert records
+    assert {record['route'] for record in records} == {'venues.show_venue'}
@@ -0,0 +1,37 @@
+import os
+
+from app import create_app
+
+
+def make_app(tmp_path, **config):
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "fyyur.db"}',
+        'CACHE_TYPE': 'null',
+        'TEMPLATE_CACHE_DIR': str(tmp_path / 'templates'),
+        'TESTING': True,
+        **config
+    })
+
+
+def cached(tmp_path):
+    return {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(tmp_path / 'templates')}
+
+
+def test_warmup_compiles_every_template(tmp_path):
+    app = make_app(tmp_path, TEMPLATE_WARMUP=True)
+    assert len(cached(tmp_path)) == len(app.jinja_env.list_templates(extensions=['html']))
+
+
+def test_warmup_reads_the_bytecode_cache(tmp_path):
+    make_app(tmp_path, TEMPLATE_WARMUP=True)
+    before = cached(tmp_path)
+    app = make_app(tmp_path, TEMPLATE_WARMUP=True)
+    assert cached(tmp_path) == before
+    assert app.test_client().get('/').status_code == 200
+
+
+def test_templates_compile_on_first_render_without_warmup(tmp_path):
+    app = make_app(tmp_path, TEMPLATE_WARMUP=False)
+    assert cached(tmp_path) == {}
+    assert app.test_client().get('/').status_code == 200
+    assert len(cached(tmp_path)) > 0
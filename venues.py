@@ -0,0 +1,264 @@
+import sys
+from itertools import groupby
+
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
+
+from extensions import db, response_cache
+from forms import VenueForm
+from helpers import (
+    conditional, facet_args, facet_counts, facet_criteria, get_genres, invalidate_venue, page_args,
+    render_calendar, search_serializer, split_shows, venue_shows_query
+)
+from models import Show, ShowArchive, Venue, relist, touch_venue, uncount_venue_shows, unlist_venue_shows
+from pagination import keyset_page
+
+bp = Blueprint('venues', __name__)
+
+
+def venue_summary_serializer(venue):
+    # The venue's own fields, without its shows.
+    data = {
+        'id': venue.id,
+        'name': venue.name,
+        "genres": [genre.name for genre in venue.genres],
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website_link,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link
+    }
+    return data
+
+
+def venue_serializer(venue, shows=None):
+    # ``shows`` are the venue's show rows when the caller already has them.
+    if shows is None:
+        shows = venue_shows_query(venue.id)
+    past_shows, upcoming_shows = split_shows(shows)
+
+    data = venue_summary_serializer(venue)
+    data.update({
+        'past_shows': past_shows,
+        'upcoming_shows': upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows)
+    })
+    return data
+
+
+def venue_areas_serializer(rows):
+    # Group (id, name, city, state) rows, already ordered by state and city,
+    # into the area entries rendered by venues.html.
+    data = []
+    for (state, city), venues in groupby(rows, key=lambda row: (row.state, row.city)):
+        data.append({
+            'city': city,
+            'state': state,
+            'venues': [{
+                'id': venue.id,
+                'name': venue.name,
+                'num_upcoming_shows': venue.upcoming_shows_count
+            } for venue in venues]
+        })
+    return data
+
+
+VENUES_KEYS = (Venue.state, Venue.city, Venue.name, Venue.id)
+
+
+def venues_query(filters=None):
+    return db.session.query(
+        Venue.id, Venue.name, Venue.city, Venue.state, Venue.upcoming_shows_count
+    ).filter(
+        *facet_criteria(Venue, filters or {}))
+
+
+def venues_serializer(per_page, after=None, before=None, filters=None):
+    page = keyset_page(venues_query(filters), VENUES_KEYS, per_page, after=after, before=before)
+    return venue_areas_serializer(page.items), page
+
+
+@bp.route('/venues')
+@response_cache.cached('venues')
+def venues():
+    filters = facet_args()
+    data, page = venues_serializer(**page_args(), filters=filters)
+    return render_template(
+        'pages/venues.html', areas=data, page=page,
+        filters=filters, facets=facet_counts(Venue, filters))
+
+
+@bp.route('/venues/search', methods=['POST'])
+def search_venues():
+    # implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for Hop should return "The Musical Hop".
+    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+    search_term = request.form.get('search_term', '')
+    page = max(request.form.get('page', 1, type=int), 1)
+    response = search_serializer(search_term, page=page)
+    return render_template(
+        'pages/search_venues.html',
+        results=response, search_term=search_term)
+
+
+@bp.route('/venues/<int:venue_id>')
+@conditional(Venue, 'venue_id')
+@response_cache.cached('venue:{venue_id}')
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+    return render_venue_page(venue_serializer(Venue.query.get_or_404(venue_id)))
+
+
+def render_venue_page(data):
+    # The first upcoming show becomes a past one when it starts, so the
+    # cached page expires then.
+    if data['upcoming_shows']:
+        response_cache.expire_at(data['upcoming_shows'][0]['start_time'].timestamp())
+    return render_template('pages/show_venue.html', venue=data)
+
+
+@bp.route('/venues/<int:venue_id>/calendar')
+@response_cache.cached('venue:{venue_id}')
+def venue_calendar(venue_id):
+    # the venue's shows over ?month=YYYY-MM or ?start=...&end=..., by day
+    venue = Venue.query.get_or_404(venue_id)
+    return render_calendar(venue, url_for('venues.show_venue', venue_id=venue_id))
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    form = VenueForm(request.form)
+    data = form.data.copy()
+    _ = data.pop('csrf_token')
+    venue_id = None
+    genres = data.pop('genres')
+    error = False
+    try:
+        genres = get_genres(genres)
+        venue = Venue(**data, genres=genres)
+        db.session.add(venue)
+        db.session.commit()
+        venue_id = venue.id
+        response_cache.invalidate('venues')
+    except Exception as e:
+        db.session.rollback()
+        error = True
+        print(e)
+    finally:
+        db.session.close()
+        if not error:
+            flash(
+                f'Venue {form.name.data} was successfully listed!',
+                category='success-message'
+            )
+            return redirect(url_for('venues.show_venue', venue_id=venue_id))
+        else:
+            flash(
+                f'An Error occurred while creating Venue {form.name.data}',
+                category='error-message'
+            )
+
+    # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return render_template('pages/home.html')
+
+
+@bp.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+    try:
+        venue = Venue.query.get(venue_id)
+        artist_ids = uncount_venue_shows(venue.id)
+        unlist_venue_shows(venue.id)
+        Show.query.filter_by(venue_id=venue.id).delete(synchronize_session=False)
+        ShowArchive.query.filter_by(venue_id=venue.id).delete(synchronize_session=False)
+        db.session.delete(venue)
+        db.session.commit()
+        invalidate_venue(venue.id, artist_ids)
+        response_cache.invalidate('artists')
+    except Exception as e:
+        db.session.rollback()
+        sys.stdout.write(e)
+    finally:
+        db.session.close()
+    return jsonify({'success': True})
+
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    form = VenueForm()
+    venue = Venue.query.get_or_404(venue_id)
+
+    form.name.data = venue.name
+    form.city.data = venue.city
+    form.genres.data = [genre.name for genre in venue.genres]
+    form.address.data = venue.address
+    form.state.data = venue.state
+    form.phone.data = venue.phone
+    form.website_link.data = venue.website_link
+    form.facebook_link.data = venue.facebook_link
+    form.seeking_talent.data = venue.seeking_talent
+    form.seeking_description.data = venue.seeking_description
+    form.image_link.data = venue.image_link
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    # venue record with ID <venue_id> using the new attributes
+    form = VenueForm(request.form)
+    data = form.data.copy()
+    _ = data.pop('csrf_token')
+    venue = Venue.query.get_or_404(venue_id)
+    genres = data.pop('genres')
+    error = False
+    try:
+        genres = get_genres(genres)
+        venue.name = form.name.data
+        venue.city = form.city.data
+        venue.state = form.state.data
+        venue.phone = form.phone.data
+        venue.genres = genres
+        venue.address = form.address.data
+        venue.seeking_talent = form.seeking_talent.data
+        venue.seeking_description = form.seeking_description.data
+        venue.facebook_link = form.facebook_link.data
+        venue.website_link = form.website_link.data
+        venue.image_link = form.image_link.data
+        relist(venue)
+        touch_venue(venue)
+
+        db.session.commit()
+        invalidate_venue(venue_id)
+    except Exception as e:
+        db.session.rollback()
+        error = True
+        print(e)
+    finally:
+        db.session.close()
+        if not error:
+            flash(
+                f'Venue {form.name.data} was successfully updated!',
+                category='success-message'
+            )
+            return redirect(url_for('venues.show_venue', venue_id=venue_id))
+        else:
+            flash(
+                f'An Error occurred while updating Venue {form.name.data}',
+                category='error-message'
+            )
+    return redirect(url_for('venues.show_venue', venue_id=venue_id))
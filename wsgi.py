@@ -0,0 +1,15 @@
+# Entry point for pre-forking servers, e.g.
+#
+#     gunicorn --preload --workers 4 wsgi:app
+#
+# With --preload the application is built once in the master process and the
+# workers share its memory copy-on-write. gc.freeze() moves everything built
+# so far out of the collector's reach, so a worker's garbage collections do
+# not touch (and copy) those pages.
+
+import gc
+
+from app import create_app
+
+app = create_app()
+gc.freeze()